@@ -13,10 +13,11 @@ class Embeadings(nn.Module):
             nn.Linear(embedDim * 4 , embedDim),
         )
         self.posEMB = nn.Embedding(numPosEmbeading,embedDim)
+        # Position ids built once (not saved, so older checkpoints still load)
+        self.register_buffer("positions", torch.arange(numPosEmbeading), persistent=False)
     def forward(self, emb, pos = None):
         if pos == None:
-            temp = torch.arange(emb.shape[1])
-            pos = temp.unsqueeze(0).expand(emb.shape[0], -1).to(emb.device)
+            pos = self.positions[:emb.shape[1]].unsqueeze(0).expand(emb.shape[0], -1)
         # print(pos.shape)
         return self.MLP(emb) + self.posEMB(pos)
 
@@ -33,10 +34,13 @@ class EncoderBLock(nn.Module):
         self.Norm1 = nn.LayerNorm(self.embedDim)
         self.Norm2 = nn.LayerNorm(self.embedDim)
         self.Drop = nn.Dropout(dropout,inplace=True)
-    def forward(self, inp, mask = None):
-        a_o, _ = self.Attantion.forward(inp, inp , inp, key_padding_mask=mask)
-        # print(len(a_o))
-        l1 = self.Norm1(inp + self.Drop(a_o))
+    def forward(self, inp, mask = None, query = None):
+        # query defaults to inp (self-attention); a subset of positions attends to the whole of inp
+        if query is None:
+            query = inp
+        # Attention weights are never used, so not computed
+        a_o, _ = self.Attantion.forward(query, inp , inp, key_padding_mask=mask, need_weights=False)
+        l1 = self.Norm1(query + self.Drop(a_o))
         m_o = self.MLP(l1)
         op = self.Norm2(m_o + l1)
         return op
@@ -0,0 +1,140 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+import train
+
+MODES = ("forward", "backward", "inference")
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _step(model, mode, x, y, criterion):
+    if mode == "inference":
+        with torch.inference_mode():
+            model(x)
+    elif mode == "forward":
+        model(x)
+    else:
+        model.zero_grad(set_to_none=True)
+        criterion(model(x), y).backward()
+
+
+def run_case(case, repeats=20, warmup=3):
+    """Time one (mode, batch, seq_len, embed_dim, num_layers, threads) case; returns its result record."""
+    torch.set_num_threads(case["threads"])
+    torch.manual_seed(0)
+    model = train.make_model(4, case["seq_len"], case["embed_dim"], case["num_heads"], case["num_layers"],
+                             case["seq_len"])
+    model.train(case["mode"] != "inference")
+    x = torch.randn(case["batch"], case["seq_len"], 4)
+    y = torch.randn(case["batch"], case["seq_len"], 2)
+    criterion = torch.nn.MSELoss()
+
+    for _ in range(warmup):
+        _step(model, case["mode"], x, y, criterion)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _step(model, case["mode"], x, y, criterion)
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1000
+    return dict(case, p50_ms=float(np.percentile(times, 50)), p90_ms=float(np.percentile(times, 90)),
+                p99_ms=float(np.percentile(times, 99)),
+                samples_per_sec=float(case["batch"] / np.median(times) * 1000), peak_rss_mb=peak_rss_mb())
+
+
+def _isolated(case, repeats, warmup, queue):
+    queue.put(run_case(case, repeats, warmup))
+
+
+def run_isolated(case, repeats, warmup):
+    # A fresh process per case, so peak RSS belongs to that case alone
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.SimpleQueue()
+    proc = ctx.Process(target=_isolated, args=(case, repeats, warmup, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def cases(args):
+    for mode, batch, seq_len, dim, layers, threads in itertools.product(
+            args.modes, args.batch, args.seq_len, args.embed_dim, args.layers, args.threads):
+        yield {"mode": mode, "batch": batch, "seq_len": seq_len, "embed_dim": dim // args.heads * args.heads,
+               "num_heads": args.heads, "num_layers": layers, "threads": threads}
+
+
+def case_key(record):
+    return tuple(record[k] for k in ("mode", "batch", "seq_len", "embed_dim", "num_heads", "num_layers", "threads"))
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the p50 ratio to a previous run for every shared case; returns the cases slower than 1 + tolerance."""
+    baseline = {case_key(r): r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    regressions = []
+    for record in results:
+        old = baseline.get(case_key(record))
+        if old is None:
+            continue
+        ratio = record["p50_ms"] / old["p50_ms"]
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{record['mode']:<9} batch={record['batch']:<5} seq={record['seq_len']:<4} dim={record['embed_dim']:<4} "
+              f"layers={record['num_layers']:<3} threads={record['threads']:<3} p50 x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(record)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EncoderOnly forward/backward/inference throughput and memory.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 32, 128, 1024])
+    parser.add_argument("--seq-len", type=int, nargs="+", default=[10, 24, 60], help="window length (numPosEmbeading)")
+    parser.add_argument("--embed-dim", type=int, nargs="+", default=[10, 32])
+    parser.add_argument("--heads", type=int, default=2)
+    parser.add_argument("--layers", type=int, nargs="+", default=[2, 6])
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--isolate", action="store_true", help="run each case in its own process for per-case peak RSS")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to compare p50 latency against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    results = []
+    for case in cases(args):
+        record = (run_isolated if args.isolate else run_case)(case, args.repeats, args.warmup)
+        results.append(record)
+        print(f"{record['mode']:<9} batch={record['batch']:<5} seq={record['seq_len']:<4} dim={record['embed_dim']:<4} "
+              f"layers={record['num_layers']:<3} threads={record['threads']:<3} "
+              f"p50 {record['p50_ms']:8.2f}ms p99 {record['p99_ms']:8.2f}ms "
+              f"{record['samples_per_sec']:10.0f} samples/s  peak RSS {record['peak_rss_mb']:.0f} MB")
+
+    env = {"torch": torch.__version__, "python": platform.python_version(), "machine": platform.machine(),
+           "processor": platform.processor(), "cpus": multiprocessing.cpu_count(), "isolated": args.isolate,
+           "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    Path(args.out).write_text(json.dumps({"environment": env, "results": results}, indent=1))
+    print(f"Wrote {len(results)} results to {args.out}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
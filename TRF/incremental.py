@@ -0,0 +1,133 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+
+import quantize
+import train
+import window_dataset
+
+
+class IncrementalEncoder:
+    """Rolling EncoderOnly inference that embeds every timestep once.
+
+    Consecutive windows share all but one timestep, and the embedding MLP
+    works on each timestep on its own, so its output is cached per
+    (location, date). A window is then the cached rows plus the precomputed
+    position embeddings, and only the attention blocks run per window (the
+    last block and the head just for the final position, the only one the
+    forecast reads). Outputs equal model(windows)[:, -1] for the same inputs.
+
+    This saves little time: attention is unmasked, so every block output
+    depends on the whole window and nothing past the embeddings carries
+    over from one window to the next. The blocks dominate the cost, so a
+    rolling pass is only about 15% faster than full windows and a second
+    pass with warm embeddings is no faster than the first (see main()).
+    Backtests keep using forecast_service.predict on full windows.
+
+    Inputs are scaled feature rows; `pad` is the scaled row used before a
+    location's first timestep (the raw zeros of the training windows).
+    """
+
+    def __init__(self, model, window, pad=None):
+        self.model = model.eval()
+        self.window = window
+        embed = model.Embead
+        n_features = embed.MLP[0].in_features
+        with torch.inference_mode():
+            self.positions = embed.posEMB(embed.positions[:window])
+            pad = torch.zeros(n_features) if pad is None else torch.as_tensor(pad, dtype=torch.float32)
+            self.pad = embed.MLP(pad[None])
+        self.cache = {}
+
+    def _embeddings(self, location, dates, steps):
+        # Embed only the dates not seen before for this location, in one batch.
+        # Each location keeps one tensor of embedded rows plus a date -> row index.
+        index, rows = self.cache.get(location, ({}, None))
+        missing = [i for i, date in enumerate(dates) if date not in index]
+        if missing:
+            new = self.model.Embead.MLP(torch.as_tensor(np.asarray(steps)[missing], dtype=torch.float32))
+            first = 0 if rows is None else len(rows)
+            rows = new if rows is None else torch.cat([rows, new])
+            for k, i in enumerate(missing):
+                index[dates[i]] = first + k
+            self.cache[location] = (index, rows)
+        return rows[[index[date] for date in dates]]
+
+    def _encode(self, windows):
+        x = windows + self.positions
+        blocks = list(self.model.Blocks)
+        for block in blocks[:-1]:
+            x = block(x)
+        # Only the last position feeds the prediction, so the last block and
+        # the head run for that query alone (keys and values still span the window)
+        x = blocks[-1](x, query=x[:, -1:])
+        return self.model.NSP(x[:, -1])
+
+    @torch.inference_mode()
+    def forecast(self, location, dates, steps, batch_size=4096):
+        """Predictions (scaled) at every date of one location's consecutive series, shape (len(dates), targets)."""
+        emb = self._embeddings(location, list(dates), steps)
+        padded = torch.cat([self.pad.expand(self.window - 1, -1), emb])
+        windows = padded.unfold(0, self.window, 1).transpose(1, 2)
+        return torch.cat([self._encode(chunk) for chunk in torch.split(windows, batch_size)])
+
+    @torch.inference_mode()
+    def step(self, location, history_dates, date, features):
+        """Prediction (scaled) for the window ending at `date`, embedding only that new timestep.
+
+        history_dates are the location's previous dates, oldest first; those
+        beyond the cache are treated as padding.
+        """
+        history = list(history_dates)[-(self.window - 1):]
+        emb = self._embeddings(location, [date], np.asarray(features)[None])
+        index, rows = self.cache[location]
+        previous = rows[[index[d] for d in history if d in index]]
+        padding = self.pad.expand(self.window - 1 - len(previous), -1)
+        return self._encode(torch.cat([padding, previous, emb])[None])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check incremental rolling inference against full windows and time both.")
+    parser.add_argument("--checkpoint", default=str(quantize.HERE / "PredTRF"))
+    parser.add_argument("--series", default=str(train.SERIES_DIR))
+    args = parser.parse_args()
+
+    model, meta = quantize.load_float(args.checkpoint)
+    series, starts, series_meta = window_dataset.open_series(args.series)
+    n_features = len(meta["features"])
+    mean, std = np.asarray(meta["mean"], np.float32), np.asarray(meta["std"], np.float32)
+    scaled = (np.asarray(series, dtype=np.float32) - mean) / std
+    offsets = series_meta["offsets"]
+    window = meta["window"]
+
+    # Full re-encoding: every window materialized and run through the model
+    dataset = window_dataset.WindowDataset(series, starts, window, n_features, window_dataset.Scaler(mean, std))
+    start = time.perf_counter()
+    with torch.inference_mode():
+        full = torch.cat([model(x)[:, -1] for x, _ in window_dataset.loader(dataset, 4096, shuffle=False)])
+    full_seconds = time.perf_counter() - start
+
+    incremental = IncrementalEncoder(model, window, pad=-mean[:n_features] / std[:n_features])
+    start = time.perf_counter()
+    outputs = []
+    for k, name in enumerate(series_meta["locations"]):
+        rows = starts[offsets[k]:offsets[k + 1]] + window - 1
+        outputs.append(incremental.forecast(name, range(len(rows)), scaled[rows, :n_features]))
+    fast = torch.cat(outputs)
+    fast_seconds = time.perf_counter() - start
+
+    # A second pass over the same dates only runs the encoder blocks
+    start = time.perf_counter()
+    for k, name in enumerate(series_meta["locations"]):
+        rows = starts[offsets[k]:offsets[k + 1]] + window - 1
+        incremental.forecast(name, range(len(rows)), scaled[rows, :n_features])
+    warm_seconds = time.perf_counter() - start
+
+    print(f"max difference {float((full - fast).abs().max()):.2e} over {len(full)} windows")
+    print(f"full windows {full_seconds:.2f}s, incremental {fast_seconds:.2f}s (cached embeddings {warm_seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+import EnchoderTRF
+import train
+import window_dataset
+
+HERE = Path(__file__).resolve().parent
+QUANTIZED = HERE / "PredTRF.int8.pt"
+FROZEN = HERE / "PredTRF.frozen.pt"
+BATCH_SIZES = [1, 32, 1024]
+# Batch the exported variants are timed on; forecast_service.predict_series runs batches of 4096
+EXPORT_BATCH = 4096
+EXPORT_ROUNDS = 4
+
+
+def load_float(checkpoint):
+    """The float EncoderOnly of a train.py checkpoint and its <checkpoint>.json meta."""
+    meta = json.loads(Path(f"{checkpoint}.json").read_text())
+    cfg = meta["model"]
+    model = EnchoderTRF.EncoderOnly(cfg["vocabSize"], cfg["embedDim"], cfg["numHeads"],
+                                    cfg["numLayers"], cfg["numPosEmbeading"])
+    model.load_state_dict(torch.load(checkpoint, map_location="cpu", weights_only=True))
+    return model.eval(), meta
+
+
+def freeze(model, example):
+    """Trace and freeze a model into a TorchScript graph with its weights folded in."""
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, example, check_trace=False)
+    return torch.jit.freeze(traced.eval())
+
+
+def quantize(model):
+    # Weights of every nn.Linear to int8; activations are quantized on the fly per batch.
+    # MultiheadAttention keeps its float projections, which dynamic quantization does not cover.
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def export(checkpoint, out=QUANTIZED, frozen_out=FROZEN):
+    """Write the int8 and the float frozen TorchScript artifacts for checkpoint (and their metas).
+
+    Each meta records the checkpoint's content hash as "source_sha1", so the
+    dashboard can tell when an artifact is older than the checkpoint, and
+    the artifact's best median seconds per EXPORT_BATCH windows on this
+    machine as "seconds", so it can serve whichever variant is faster here.
+    """
+    model, meta = load_float(checkpoint)
+    example = torch.zeros(2, meta["window"], len(meta["features"]))
+    x = torch.randn(EXPORT_BATCH, meta["window"], len(meta["features"]), generator=torch.Generator().manual_seed(0))
+    meta["source_sha1"] = file_sha1(checkpoint)
+    variants = {frozen_out: freeze(model, example), out: freeze(quantize(model), example)}
+    # Alternate rounds and keep each variant's best, so warm-up and load spikes do not favour one
+    timings = {path: [] for path in variants}
+    for _ in range(EXPORT_ROUNDS):
+        for path, frozen in variants.items():
+            timings[path].append(latency(frozen, x, repeats=5))
+    for path, frozen in variants.items():
+        torch.jit.save(frozen, path)
+        Path(f"{path}.json").write_text(json.dumps({**meta, "seconds": min(timings[path])}))
+    return out, frozen_out
+
+
+def load_artifact(path=QUANTIZED):
+    """The exported TorchScript model and its meta, ready for inference."""
+    meta = json.loads(Path(f"{path}.json").read_text())
+    return torch.jit.load(str(path), map_location="cpu").eval(), meta
+
+
+@torch.inference_mode()
+def drift(reference, candidate, loader):
+    """Compare two models on the same (scaled) windows: output RMSE/max gap and each model's MSE."""
+    sq_gap = max_gap = ref_mse = cand_mse = 0.0
+    n = 0
+    for x, y in loader:
+        ref, cand = reference(x), candidate(x)
+        sq_gap += ((ref - cand) ** 2).sum().item()
+        max_gap = max(max_gap, (ref - cand).abs().max().item())
+        ref_mse += ((ref - y) ** 2).sum().item()
+        cand_mse += ((cand - y) ** 2).sum().item()
+        n += y.numel()
+    return {"rmse_gap": (sq_gap / n) ** 0.5, "max_gap": max_gap, "reference_mse": ref_mse / n,
+            "candidate_mse": cand_mse / n}
+
+
+@torch.inference_mode()
+def latency(model, x, repeats=20, warmup=3):
+    """Median seconds per call of model(x)."""
+    for _ in range(warmup):
+        model(x)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model(x)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export EncoderOnly as int8 and float TorchScript and compare them with the float model.")
+    parser.add_argument("--checkpoint", default=str(HERE / "PredTRF"))
+    parser.add_argument("--out", default=str(QUANTIZED))
+    parser.add_argument("--frozen-out", default=str(FROZEN))
+    parser.add_argument("--series", default=str(train.SERIES_DIR))
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    args = parser.parse_args()
+    train.set_threads(args.threads)
+
+    export(args.checkpoint, args.out, args.frozen_out)
+    float_model, meta = load_float(args.checkpoint)
+    quantized, quantized_meta = load_artifact(args.out)
+    frozen, frozen_meta = load_artifact(args.frozen_out)
+    print(f"Wrote {args.out} ({quantized_meta['seconds'] * 1000:.1f} ms per {EXPORT_BATCH} windows) and "
+          f"{args.frozen_out} ({frozen_meta['seconds'] * 1000:.1f} ms); the dashboard serves the faster one")
+    _, test_ds = train.load_datasets(args.series)
+    result = drift(float_model, quantized, window_dataset.loader(test_ds, 1024, shuffle=False))
+    print(f"validation drift: output RMSE {result['rmse_gap']:.5f}, max {result['max_gap']:.5f}; "
+          f"MSE float {result['reference_mse']:.5f} vs int8 {result['candidate_mse']:.5f}")
+
+    example = torch.zeros(2, meta["window"], len(meta["features"]))
+    variants = {"float eager": float_model, "float frozen": frozen, "int8 frozen": quantized}
+    print(f"{'batch':>6} " + " ".join(f"{name + ' ms':>16} {'samples/s':>10}" for name in variants))
+    for batch in args.batch_sizes:
+        x, _ = test_ds[np.arange(min(batch, len(test_ds)))]
+        cells = []
+        for model in variants.values():
+            seconds = latency(model, x)
+            cells.append(f"{seconds * 1000:>16.3f} {len(x) / seconds:>10.0f}")
+        print(f"{batch:>6} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+import train
+import window_data
+import window_dataset
+
+logger = logging.getLogger(__name__)
+
+HERE = Path(__file__).resolve().parent
+# anirban.py reads the store from the repository root, next to LossTRF.npz
+STORE = HERE.parent / "sweep_results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    trial INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep TEXT NOT NULL,
+    config TEXT NOT NULL,
+    status TEXT NOT NULL,
+    best_val REAL,
+    epochs INTEGER,
+    seconds REAL
+);
+CREATE TABLE IF NOT EXISTS curves (
+    trial INTEGER NOT NULL,
+    epoch INTEGER NOT NULL,
+    train_loss REAL NOT NULL,
+    val_loss REAL NOT NULL,
+    PRIMARY KEY (trial, epoch)
+);
+"""
+
+
+def connect(path=STORE):
+    conn = sqlite3.connect(path, timeout=60)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def config_label(config):
+    return f"dim={config['embed_dim']} heads={config['num_heads']} layers={config['num_layers']} pos={config['num_pos']}"
+
+
+def grid(embed_dims, heads, layers, positions, window):
+    """Every distinct EncoderOnly configuration; embedDim is floored to a multiple of numHeads as the model does."""
+    seen = []
+    for dim, h, n, pos in itertools.product(embed_dims, heads, layers, positions):
+        config = {"embed_dim": dim // h * h, "num_heads": h, "num_layers": n, "num_pos": pos}
+        if config["embed_dim"] > 0 and pos >= window and config not in seen:
+            seen.append(config)
+    return seen
+
+
+_worker = {}
+
+
+def _init_worker(core_sets, series_path, scaler):
+    # Each worker takes its own slice of cores and keeps its torch pool inside it
+    cores = core_sets.get()
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    train.set_threads(max(len(cores), 1), 1)
+    series, starts, meta = window_dataset.open_series(series_path)
+    _worker.update(series=series, starts=starts, meta=meta, scaler=scaler)
+
+
+def _should_stop(conn, sweep, trial, epoch, history, grace, patience, min_peers):
+    best_epoch = int(np.argmin(history))
+    if epoch - 1 - best_epoch >= patience:
+        return "stopped"
+    if epoch < grace:
+        return None
+    # Median stopping rule: prune when this trial's best so far is worse than
+    # the median of what the other trials had reached by the same epoch
+    rows = conn.execute(
+        "SELECT MIN(c.val_loss) FROM curves c JOIN trials t ON t.trial = c.trial "
+        "WHERE t.sweep = ? AND c.trial != ? AND c.epoch <= ? GROUP BY c.trial",
+        (sweep, trial, epoch)).fetchall()
+    peers = [r[0] for r in rows]
+    if len(peers) >= min_peers and min(history) > np.median(peers):
+        return "pruned"
+    return None
+
+
+def run_trial(store, sweep, config, epochs, batch_size, lr, seed, grace, patience, min_peers):
+    import torch
+
+    torch.manual_seed(seed)
+    meta, series, starts = _worker["meta"], _worker["series"], _worker["starts"]
+    window = meta["window"]
+    test = window_data.block_split(len(starts), seed=seed)
+    n_features = len(meta["features"])
+    train_ds = window_dataset.WindowDataset(series, starts[~test], window, n_features, _worker["scaler"])
+    test_ds = window_dataset.WindowDataset(series, starts[test], window, n_features, _worker["scaler"])
+    generator = torch.Generator().manual_seed(seed)
+    train_dl = window_dataset.loader(train_ds, batch_size, shuffle=True, generator=generator)
+    test_dl = window_dataset.loader(test_ds, batch_size, shuffle=False)
+
+    model = train.make_model(n_features, window, config["embed_dim"], config["num_heads"], config["num_layers"],
+                             config["num_pos"])
+
+    conn = connect(store)
+    with conn:
+        trial = conn.execute("INSERT INTO trials (sweep, config, status) VALUES (?, ?, 'running')",
+                             (sweep, json.dumps(config))).lastrowid
+    state = {"status": "completed"}
+    history = []
+
+    def on_epoch(epoch, train_loss, val_loss):
+        history.append(val_loss)
+        with conn:
+            conn.execute("INSERT INTO curves VALUES (?, ?, ?, ?)", (trial, epoch, train_loss, val_loss))
+        if epoch == epochs:
+            # Trained every epoch: recorded as completed, never stopped or pruned
+            return False
+        stop = _should_stop(conn, sweep, trial, epoch, history, grace, patience, min_peers)
+        if stop:
+            state["status"] = stop
+        return bool(stop)
+
+    start = time.perf_counter()
+    train.fit(model, train_dl, test_dl, epochs, lr, on_epoch=on_epoch)
+    seconds = time.perf_counter() - start
+    with conn:
+        conn.execute("UPDATE trials SET status = ?, best_val = ?, epochs = ?, seconds = ? WHERE trial = ?",
+                     (state["status"], min(history), len(history), seconds, trial))
+    conn.close()
+    return trial, config, state["status"], min(history), len(history)
+
+
+def core_slices(workers, cores=None):
+    cores = sorted(cores if cores is not None else
+                   (os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else range(os.cpu_count() or 1)))
+    per = max(len(cores) // workers, 1)
+    return [cores[(i * per) % len(cores):(i * per) % len(cores) + per] for i in range(workers)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an EncoderOnly hyperparameter sweep in a process pool.")
+    parser.add_argument("--series", default=str(train.SERIES_DIR))
+    parser.add_argument("--store", default=str(STORE))
+    parser.add_argument("--sweep", default=time.strftime("%Y-%m-%d %H:%M:%S"), help="label grouping these trials")
+    parser.add_argument("--embed-dim", type=int, nargs="+", default=[8, 10, 16])
+    parser.add_argument("--heads", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--layers", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--pos", type=int, nargs="+", default=[10])
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 1) // 2, 1))
+    parser.add_argument("--grace", type=int, default=5, help="epochs before a trial can be pruned")
+    parser.add_argument("--patience", type=int, default=10, help="epochs without improvement before stopping")
+    parser.add_argument("--min-peers", type=int, default=3, help="other trials needed for the median rule")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    # Built and scaled once; workers memory-map the same files read-only
+    series_path = Path(args.series)
+    if not (series_path / "meta.json").exists():
+        train.load_datasets(series_path)
+    series, starts, meta = window_dataset.open_series(series_path)
+    test = window_data.block_split(len(starts), seed=args.seed)
+    scaler = window_dataset.Scaler.fit_windows(series, starts[~test], meta["window"])
+
+    configs = grid(args.embed_dim, args.heads, args.layers, args.pos, meta["window"])
+    connect(args.store).close()
+    logger.info("Sweep %r: %d configurations on %d workers", args.sweep, len(configs), args.workers)
+
+    ctx = multiprocessing.get_context("spawn")
+    core_sets = ctx.Queue()
+    for cores in core_slices(args.workers):
+        core_sets.put(cores)
+    with ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(core_sets, str(series_path), scaler)) as pool:
+        futures = [pool.submit(run_trial, args.store, args.sweep, config, args.epochs, args.batch_size,
+                               args.lr, args.seed, args.grace, args.patience, args.min_peers)
+                   for config in configs]
+        for future in as_completed(futures):
+            trial, config, status, best, epochs = future.result()
+            print(f"trial {trial:>4} {config_label(config):<40} {status:<9} best val {best:.5f} after {epochs} epochs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data.distributed import DistributedSampler
+
+import EnchoderTRF
+import window_data
+import window_dataset
+
+logger = logging.getLogger(__name__)
+
+HERE = Path(__file__).resolve().parent
+SERIES_DIR = HERE / "series"
+# anirban.py reads the loss curves from the repository root
+LOSSES = HERE.parent / "LossTRF.npz"
+
+
+def set_threads(intra_op=None, inter_op=None):
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        # Only allowed before the first parallel region runs
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as exc:
+            logger.warning("Could not set inter-op threads: %s", exc)
+
+
+def load_datasets(path=SERIES_DIR, source=window_data.SOURCE, seed=0):
+    """Train/test WindowDatasets from a series directory, building it from the CSV on first use."""
+    path = Path(path)
+    if not (path / "meta.json").exists():
+        import pandas as pd
+
+        window_data.save_series(pd.read_csv(source), path)
+    return window_dataset.datasets(path, seed=seed)
+
+
+def make_model(n_features, window=window_data.WINDOW, embed_dim=10, num_heads=2, num_layers=6, num_pos=None):
+    return EnchoderTRF.EncoderOnly(n_features, embedDim=embed_dim, numHeads=num_heads,
+                                   numLayers=num_layers, numPosEmbeading=num_pos or max(window, 10))
+
+
+def maybe_compile(model, enabled=True):
+    if not enabled or not hasattr(torch, "compile"):
+        return model
+    try:
+        return torch.compile(model)
+    except Exception as exc:  # missing compiler toolchain and the like
+        logger.warning("torch.compile unavailable, running eagerly: %s", exc)
+        return model
+
+
+def train_epoch(model, loader, optimizer, criterion, bf16=False, clip=1.0):
+    """One pass over loader; returns (mean loss, samples, seconds). The loss stays on-device until the end."""
+    model.train()
+    total = torch.zeros(())
+    samples = 0
+    start = time.perf_counter()
+    for x, y in loader:
+        optimizer.zero_grad(set_to_none=True)
+        with torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+            out = model(x)
+        loss = criterion(out.float(), y)
+        loss.backward()
+        torch.nn.utils.clip_grad_value_(model.parameters(), clip)
+        optimizer.step()
+        total += loss.detach() * len(x)
+        samples += len(x)
+    return total.item() / max(samples, 1), samples, time.perf_counter() - start
+
+
+@torch.inference_mode()
+def evaluate(model, loader, criterion, bf16=False):
+    """Mean loss over loader without building autograd graphs; returns (mean loss, samples, seconds)."""
+    model.eval()
+    total = torch.zeros(())
+    samples = 0
+    start = time.perf_counter()
+    for x, y in loader:
+        with torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+            out = model(x)
+        total += criterion(out.float(), y) * len(x)
+        samples += len(x)
+    return total.item() / max(samples, 1), samples, time.perf_counter() - start
+
+
+def unwrap(model):
+    # The plain EncoderOnly under torch.compile and/or DistributedDataParallel
+    model = getattr(model, "_orig_mod", model)
+    model = getattr(model, "module", model)
+    return getattr(model, "_orig_mod", model)
+
+
+def _global_mean(loss, samples, seconds):
+    # Loss and throughput over all ranks when running distributed
+    if not dist.is_initialized():
+        return loss, samples, seconds
+    totals = torch.tensor([loss * samples, samples], dtype=torch.float64)
+    dist.all_reduce(totals)
+    slowest = torch.tensor([seconds], dtype=torch.float64)
+    dist.all_reduce(slowest, op=dist.ReduceOp.MAX)
+    return totals[0].item() / max(totals[1].item(), 1), int(totals[1].item()), slowest.item()
+
+
+def fit(model, train_dl, test_dl, epochs=200, lr=0.002, bf16=False, checkpoint=None, on_epoch=None):
+    """Train with Adam + MSE as in the Training notebook; returns {'train_loss', 'val_loss', 'samples_per_sec'}.
+
+    The state dict is saved to `checkpoint` whenever the validation loss
+    improves. on_epoch(epoch, train_loss, val_loss) may return True to stop.
+    """
+    criterion = torch.nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    history = {"train_loss": [], "val_loss": [], "samples_per_sec": []}
+    best = float("inf")
+    for epoch in range(1, epochs + 1):
+        sampler = getattr(train_dl.sampler, "sampler", None)
+        if hasattr(sampler, "set_epoch"):
+            sampler.set_epoch(epoch)
+        train_loss, samples, seconds = _global_mean(*train_epoch(model, train_dl, optimizer, criterion, bf16))
+        val_loss, _, _ = _global_mean(*evaluate(model, test_dl, criterion, bf16))
+        history["train_loss"].append(train_loss)
+        history["val_loss"].append(val_loss)
+        history["samples_per_sec"].append(samples / seconds)
+        logger.info("Epoch %d: train %.5f val %.5f (%.0f samples/s)", epoch, train_loss, val_loss, samples / seconds)
+        if checkpoint and val_loss < best:
+            best = val_loss
+            torch.save(unwrap(model).state_dict(), checkpoint)
+        if on_epoch and on_epoch(epoch, train_loss, val_loss):
+            break
+    return history
+
+
+def save_losses(history, path):
+    # Same layout anirban.py reads
+    np.savez(path, train_loss=np.array(history["train_loss"]), val_loss=np.array(history["val_loss"]))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _ddp_worker(rank, world_size, port, args, results):
+    # One rank of a single-machine gloo job; only rank 0 writes files
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size)
+    try:
+        # Split the cores between ranks unless told otherwise; each rank is its own process, so it sets both pools
+        set_threads(args.threads or max((os.cpu_count() or 1) // world_size, 1), args.interop_threads or 1)
+        torch.manual_seed(args.seed)
+        train_ds, test_ds = window_dataset.datasets(args.series, seed=args.seed)
+        train_sampler = DistributedSampler(train_ds, world_size, rank, shuffle=True, seed=args.seed)
+        test_sampler = DistributedSampler(test_ds, world_size, rank, shuffle=False)
+        train_dl = window_dataset.loader(train_ds, args.batch_size, sampler=train_sampler)
+        test_dl = window_dataset.loader(test_ds, args.batch_size, sampler=test_sampler)
+
+        model = DistributedDataParallel(make_model(train_ds.n_features, train_ds.window))
+        model = maybe_compile(model, args.compile)
+        checkpoint = args.checkpoint if rank == 0 else None
+        history = fit(model, train_dl, test_dl, args.epochs, args.lr, args.bf16, checkpoint)
+        if rank == 0:
+            if checkpoint:
+                save_meta(checkpoint, model, train_ds, args.seed)
+            if args.loss_out:
+                save_losses(history, args.loss_out)
+            results.put(history)
+    finally:
+        dist.destroy_process_group()
+
+
+def run_distributed(args, world_size):
+    """Train with `world_size` local gloo processes; returns rank 0's history."""
+    ctx = mp.get_context("spawn")
+    results = ctx.SimpleQueue()
+    context = mp.spawn(_ddp_worker, args=(world_size, _free_port(), args, results), nprocs=world_size, join=False)
+    # Read the result while the workers run: rank 0 blocks in put() until a large history
+    # is drained, so joining first could wait forever. join() raises if a rank fails.
+    history = None
+    while not context.join(timeout=1):
+        if history is None and not results.empty():
+            history = results.get()
+    if history is None and not results.empty():
+        history = results.get()
+    return history
+
+
+def scaling_benchmark(args, process_counts):
+    """Samples/sec of distributed training at each process count, relative to one process."""
+    args.loss_out = None
+    args.checkpoint = None
+    base = None
+    print(f"{'procs':>5} {'samples/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for n in process_counts:
+        rates = run_distributed(args, n)["samples_per_sec"]
+        rate = float(np.median(rates[1:] or rates))
+        base = base or rate
+        print(f"{n:>5} {rate:>10.0f} {rate / base:>8.2f} {rate / base / n:>10.0%}")
+
+
+def save_meta(checkpoint, model, dataset, seed=0):
+    """Write what inference needs besides the weights (model config, window, scaler, train/test split) to <checkpoint>.json."""
+    meta = {
+        "model": unwrap(model).cfgDict,
+        "window": dataset.window,
+        "features": window_data.FEATURES,
+        "targets": window_data.TARGETS,
+        "mean": dataset.scaler.mean.tolist(),
+        "std": dataset.scaler.std.tolist(),
+        # window_data.split_table arguments that reproduce the held-out windows
+        "split": {"block": window_data.BLOCK, "test_fraction": window_data.TEST_FRACTION, "seed": seed},
+    }
+    Path(f"{checkpoint}.json").write_text(json.dumps(meta))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train EncoderOnly on CPU.")
+    parser.add_argument("--series", default=str(SERIES_DIR), help="series directory from window_data.py --format series")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads (default: torch's choice)")
+    parser.add_argument("--interop-threads", type=int, default=None)
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast for the forward pass")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the model")
+    parser.add_argument("--checkpoint", default=str(HERE / "PredTRF"))
+    parser.add_argument("--loss-out", default=str(LOSSES))
+    parser.add_argument("--nproc", type=int, default=1,
+                        help="data-parallel processes (gloo); threads default to cores / nproc each")
+    parser.add_argument("--scaling", type=int, nargs="*",
+                        help="benchmark distributed training at these process counts, e.g. 1 2 4 8")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.nproc > 1 or args.scaling:
+        # Build the series once before the ranks memory-map it
+        load_datasets(args.series)
+        if args.scaling:
+            scaling_benchmark(args, args.scaling)
+            return
+        history = run_distributed(args, args.nproc)
+        print(f"nproc={args.nproc}: {np.median(history['samples_per_sec'][1:] or history['samples_per_sec']):.0f} "
+              f"samples/s; wrote {args.loss_out} and {args.checkpoint}")
+        return
+
+    set_threads(args.threads, args.interop_threads)
+    torch.manual_seed(args.seed)
+    train_ds, test_ds = load_datasets(args.series, seed=args.seed)
+    generator = torch.Generator().manual_seed(args.seed)
+    train_dl = window_dataset.loader(train_ds, args.batch_size, shuffle=True, generator=generator)
+    test_dl = window_dataset.loader(test_ds, args.batch_size, shuffle=False)
+
+    model = maybe_compile(make_model(train_ds.n_features, train_ds.window), args.compile)
+    history = fit(model, train_dl, test_dl, args.epochs, args.lr, args.bf16, args.checkpoint)
+    save_meta(args.checkpoint, model, train_ds, args.seed)
+    save_losses(history, args.loss_out)
+
+    rates = history["samples_per_sec"]
+    # The first epoch includes compilation and warm-up
+    steady = rates[1:] or rates
+    print(f"threads={torch.get_num_threads()} bf16={args.bf16} compile={args.compile}: "
+          f"{np.median(steady):.0f} samples/s (median over {len(steady)} epochs)")
+    print(f"Wrote {args.loss_out} and {args.checkpoint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+HERE = Path(__file__).resolve().parent
+SOURCE = HERE.parent / "climate_disease_dataset.csv"
+
+FEATURES = ['avg_temp_c', 'precipitation_mm', 'air_quality_index', 'uv_index']
+TARGETS = ['malaria_cases', 'dengue_cases']
+WINDOW = 10
+BLOCK = 50
+TEST_FRACTION = 0.2
+
+
+def location_series(df, columns=FEATURES + TARGETS):
+    """Stack every location's monthly series end to end.
+
+    Locations are the countries, named "country(region)", followed by the
+    regions (mean over their countries per date), as in the Training Data
+    Creation notebook. Returns (names, values (rows, columns) float32,
+    offsets) where location k owns rows offsets[k]:offsets[k + 1].
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['year'].astype(str) + '-' + df['month'].astype(str) + '-01')
+    df['country'] = df['country'].astype(str) + '(' + df['region'].astype(str) + ')'
+
+    # Countries keep their file order within each country
+    country_codes, countries = pd.factorize(df['country'], sort=True)
+    order = np.argsort(country_codes, kind='stable')
+    country_values = df[columns].to_numpy(dtype=np.float64)[order]
+    country_sizes = np.bincount(country_codes, minlength=len(countries))
+
+    region_means = df.groupby(['region', 'date'], observed=True)[columns].mean()
+    regions = region_means.index.get_level_values('region')
+    region_codes, region_names = pd.factorize(regions, sort=True)
+    region_sizes = np.bincount(region_codes, minlength=len(region_names))
+
+    names = [str(c) for c in countries] + [str(r) for r in region_names]
+    values = np.concatenate([country_values, region_means.to_numpy(dtype=np.float64)]).astype(np.float32)
+    offsets = np.r_[0, np.cumsum(np.r_[country_sizes, region_sizes])]
+    return names, values, offsets
+
+
+def window_starts(offsets, window=WINDOW):
+    """Start row of every window in the zero-padded layout built by `windows`."""
+    sizes = np.diff(offsets)
+    location = np.repeat(np.arange(len(sizes)), sizes)
+    # Every location gets window - 1 leading zero rows, so row i of the stacked
+    # series ends the window starting at i + location * (window - 1)
+    return np.arange(offsets[-1]) + location * (window - 1)
+
+
+def padded(values, offsets, window=WINDOW):
+    """values with window - 1 zero rows in front of every location."""
+    sizes = np.diff(offsets)
+    out = np.zeros((len(values) + len(sizes) * (window - 1),) + values.shape[1:], dtype=values.dtype)
+    out[window_starts(offsets, window) + window - 1] = values
+    return out
+
+
+def window_view(values, offsets, window=WINDOW):
+    """Read-only strided view of every window over the padded series, shape (padded rows - window + 1, window, columns).
+
+    The window ending at stacked row i is view[window_starts(offsets, window)[i]];
+    it is zero-padded at the start of its location and never reaches into another one.
+    """
+    return sliding_window_view(padded(values, offsets, window), window, axis=0).transpose(0, 2, 1)
+
+
+def block_split(n, block=BLOCK, test_fraction=TEST_FRACTION, seed=0):
+    """Boolean test mask over n windows: consecutive blocks go to the test set with probability test_fraction."""
+    rng = np.random.default_rng(seed)
+    test_blocks = rng.random(-(-n // block)) <= test_fraction
+    return np.repeat(test_blocks, block)[:n]
+
+
+def split_table(df, block=BLOCK, test_fraction=TEST_FRACTION, seed=0):
+    """Which set every (location, year, month) window falls in under block_split, as a frame with a boolean `test`."""
+    names, dates, offsets = location_series(df, ['year', 'month'])
+    return pd.DataFrame({
+        'location': np.repeat(names, np.diff(offsets)),
+        'year': dates[:, 0].astype(np.int16),
+        'month': dates[:, 1].astype(np.int8),
+        'test': block_split(offsets[-1], block, test_fraction, seed),
+    })
+
+
+def build(df, window=WINDOW, block=BLOCK, test_fraction=TEST_FRACTION, seed=0):
+    """x_train/x_test/y_train/y_test arrays in the layout of Data.npz."""
+    _, values, offsets = location_series(df)
+    starts = window_starts(offsets, window)
+    view = window_view(values, offsets, window)
+    test = block_split(len(starts), block, test_fraction, seed)
+    out = {}
+    for split, mask in (('train', ~test), ('test', test)):
+        w = view[starts[mask]]
+        out[f'x_{split}'] = np.ascontiguousarray(w[..., :len(FEATURES)])
+        out[f'y_{split}'] = np.ascontiguousarray(w[..., len(FEATURES):])
+    return {key: out[key] for key in ('x_train', 'x_test', 'y_train', 'y_test')}
+
+
+def save_series(df, out, window=WINDOW):
+    """Write the padded series once (series.npy), the window starts and meta.json to the directory out.
+
+    window_dataset.WindowDataset reads these back memory-mapped and cuts
+    windows on demand, so disk and RAM grow with rows, not rows x window.
+    """
+    names, values, offsets = location_series(df)
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    np.save(out / "series.npy", padded(values, offsets, window))
+    np.save(out / "starts.npy", window_starts(offsets, window))
+    meta = {"window": window, "features": FEATURES, "targets": TARGETS,
+            "locations": names, "offsets": offsets.tolist()}
+    (out / "meta.json").write_text(json.dumps(meta))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the EncoderOnly training windows (Data.npz).")
+    parser.add_argument("--source", default=str(SOURCE))
+    parser.add_argument("--out", default=str(HERE / "Data.npz"),
+                        help="Data.npz file, or a directory for --format npy/series")
+    parser.add_argument("--format", choices=["npz", "npy", "series"], default="npz",
+                        help="series writes each row once for window_dataset.WindowDataset")
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--block", type=int, default=BLOCK)
+    parser.add_argument("--test-fraction", type=float, default=TEST_FRACTION)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.format == "series":
+        save_series(pd.read_csv(args.source), args.out, args.window)
+        print(f"Wrote the padded series to {args.out}")
+        return
+    data = build(pd.read_csv(args.source), args.window, args.block, args.test_fraction, args.seed)
+    if args.format == "npz":
+        np.savez(args.out, **data)
+    else:
+        # One .npy per array so they can be opened with np.load(..., mmap_mode='r')
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        for key, array in data.items():
+            np.save(out / f"{key}.npy", array)
+    print(f"Wrote {len(data['x_train'])} train / {len(data['x_test'])} test windows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
+
+import window_data
+
+CHUNK_ROWS = 1 << 20
+
+
+class Scaler:
+    """Per-column standardization, equivalent to a fitted StandardScaler (population std, 1 for constant columns)."""
+
+    def __init__(self, mean, std):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+
+    @classmethod
+    def fit_windows(cls, series, starts, window, chunk_rows=CHUNK_ROWS):
+        """Moments of every row of every window without materializing the windows.
+
+        A row that appears in k of the given windows is counted k times, so
+        the result equals fitting StandardScaler on the stacked windows
+        reshaped to (-1, columns), as the Training notebook did. The series
+        is read in chunks, so it can stay memory-mapped.
+        """
+        # Window multiplicity of every padded row from a difference array
+        delta = np.zeros(len(series) + 1, dtype=np.int64)
+        np.add.at(delta, starts, 1)
+        np.add.at(delta, np.asarray(starts) + window, -1)
+        weights = np.cumsum(delta[:-1])
+
+        n = 0.0
+        mean = np.zeros(series.shape[1])
+        m2 = np.zeros(series.shape[1])
+        for start in range(0, len(series), chunk_rows):
+            w = weights[start:start + chunk_rows].astype(np.float64)
+            total = w.sum()
+            if total == 0:
+                continue
+            chunk = np.asarray(series[start:start + chunk_rows], dtype=np.float64)
+            chunk_mean = w @ chunk / total
+            chunk_m2 = w @ (chunk - chunk_mean) ** 2
+            # Chan et al. pairwise update of the running mean and sum of squares
+            delta_mean = chunk_mean - mean
+            mean = mean + delta_mean * total / (n + total)
+            m2 = m2 + chunk_m2 + delta_mean ** 2 * n * total / (n + total)
+            n += total
+        std = np.sqrt(m2 / max(n, 1))
+        return cls(mean, np.where(std > 0, std, 1.0))
+
+    def transform(self, values, columns=slice(None)):
+        return (values - self.mean[columns]) / self.std[columns]
+
+    def inverse(self, values, columns=slice(None)):
+        return values * self.std[columns] + self.mean[columns]
+
+
+def open_series(path):
+    """(series memmap, starts, meta) written by window_data.save_series."""
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+    series = np.load(path / "series.npy", mmap_mode="r")
+    starts = np.load(path / "starts.npy")
+    return series, starts, meta
+
+
+class WindowDataset(Dataset):
+    """Windows of a padded series, cut as strided views when they are requested.
+
+    Each row is stored once (optionally memory-mapped); item i is the window
+    starting at padded row starts[i]. Indexing with an array of indices
+    returns a whole batch in one gather, for use with a BatchSampler. Items
+    are (x, y) float32 tensors shaped (window, features) and (window,
+    targets), standardized with `scaler` when one is given.
+    """
+
+    def __init__(self, series, starts, window, n_features, scaler=None):
+        self.series = series
+        self.starts = np.asarray(starts)
+        self.window = window
+        self.n_features = n_features
+        self.scaler = scaler
+        self.view = sliding_window_view(series, window, axis=0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        windows = self.view[self.starts[index]]  # (..., columns, window), copies only these rows
+        windows = np.swapaxes(windows, -1, -2).astype(np.float32)
+        if self.scaler is not None:
+            windows = self.scaler.transform(windows)
+        x = torch.from_numpy(np.ascontiguousarray(windows[..., :self.n_features]))
+        y = torch.from_numpy(np.ascontiguousarray(windows[..., self.n_features:]))
+        return x, y
+
+
+def datasets(path, block=window_data.BLOCK, test_fraction=window_data.TEST_FRACTION, seed=0):
+    """Train and test WindowDatasets over a series directory, split and scaled like Data.npz + StandardScaler."""
+    series, starts, meta = open_series(path)
+    window = meta["window"]
+    test = window_data.block_split(len(starts), block, test_fraction, seed)
+    scaler = Scaler.fit_windows(series, starts[~test], window)
+    n_features = len(meta["features"])
+    return (WindowDataset(series, starts[~test], window, n_features, scaler),
+            WindowDataset(series, starts[test], window, n_features, scaler))
+
+
+def loader(dataset, batch_size=128, shuffle=True, generator=None, num_workers=0, sampler=None):
+    """DataLoader that fetches whole batches with one gather instead of collating single items.
+
+    `sampler` (e.g. a DistributedSampler) replaces the default random/sequential one.
+    """
+    if sampler is None:
+        sampler = RandomSampler(dataset, generator=generator) if shuffle else SequentialSampler(dataset)
+    return DataLoader(dataset, sampler=BatchSampler(sampler, batch_size, drop_last=False),
+                      batch_size=None, num_workers=num_workers)
@@ -3,6 +3,14 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import json
+import os
+import sqlite3
+import backtest
+import data_catalog
+import forecast_service
+import scenarios
+from group_stats import grouped_summary, segment_starts, summary_frame
 
 def run():
     @st.cache_data
@@ -13,51 +21,108 @@ def run():
                 'val_loss': loss_data['val_loss'],
                 'epochs' : np.arange(1, len(loss_data['val_loss']) + 1)
             }
-        data = pd.read_csv("climate_disease_dataset.csv")
-        df = data.copy()
+        df = data_catalog.load("climate_disease").copy()
         df['date'] = pd.to_datetime(df['year'].astype(str) + '-' + df['month'].astype(str) + '-01')
         df['country'] = df['country'].astype(str) + ' (' + df['region'].astype(str) + ')'
 
         REGION = np.unique(df.region)
         COUNTRY_NAME = np.unique(df['country'].values)
         dic = {}
-        for name in COUNTRY_NAME:
-            dic[name] = df[df.country == name].drop(
-                ['healthcare_budget', 'population_density', 'country', 'region', 'year'], axis=1)
-
-        for reg in REGION:
-            region_df = df[df['region'] == reg]
-            numeric_cols = region_df.select_dtypes(include=np.number).columns.tolist()
-            agg_cols = [col for col in
-                        ['avg_temp_c', 'uv_index', 'air_quality_index', 'precipitation_mm', 'malaria_cases', 'dengue_cases',
-                        'month'] if col in numeric_cols]
-            dic[reg] = region_df.groupby('date', as_index=False)[agg_cols].mean()
-            if 'month' in dic[reg]:
-                dic[reg]['month'] = dic[reg]['month'].astype(int)
+
+        # One stable sort by country, then slice each country's rows out in their original order
+        country_codes = pd.Categorical(df['country'], categories=COUNTRY_NAME).codes
+        order = np.argsort(country_codes, kind='stable')
+        country_df = df.drop(['healthcare_budget', 'population_density', 'country', 'region', 'year'],
+                             axis=1).iloc[order]
+        bounds = np.r_[segment_starts(country_codes[order]), len(order)]
+        for i, name in enumerate(COUNTRY_NAME):
+            dic[name] = country_df.iloc[bounds[i]:bounds[i + 1]]
+
+        # A single (region, date) groupby for every region's monthly means
+        numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
+        agg_cols = [col for col in
+                    ['avg_temp_c', 'uv_index', 'air_quality_index', 'precipitation_mm', 'malaria_cases', 'dengue_cases',
+                    'month'] if col in numeric_cols]
+        region_means = df.groupby(['region', 'date'], observed=True)[agg_cols].mean().reset_index()
+        if 'month' in region_means:
+            region_means['month'] = region_means['month'].astype(int)
+        region_codes = pd.Categorical(region_means['region'], categories=REGION).codes
+        bounds = np.r_[segment_starts(region_codes), len(region_codes)]
+        for i, reg in enumerate(REGION):
+            dic[reg] = region_means.iloc[bounds[i]:bounds[i + 1]].drop(columns='region').reset_index(drop=True)
 
         df_dict = dic
 
         MONTHS = {i: name for i, name in enumerate(
             ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Whole Year'], 1)}
 
+        # Every location's rows stacked once: keyed by (location, month) and by (location, whole year)
+        locations = list(COUNTRY_NAME) + list(REGION)
+        value_cols = [col for col in country_df.columns if col not in ('date', 'month')]
+        frames = [country_df] + [dic[reg] for reg in REGION]
+        location_ids = np.r_[country_codes[order], len(COUNTRY_NAME) + np.repeat(
+            np.arange(len(REGION)), [len(dic[reg]) for reg in REGION])].astype(np.int64)
+        months = np.concatenate([frame['month'].to_numpy(dtype=np.int64) for frame in frames])
+        values = np.concatenate([frame[value_cols].to_numpy(dtype=np.float64) for frame in frames])
+        keys, stats = grouped_summary(np.r_[location_ids * 14 + months, location_ids * 14 + 13],
+                                      np.vstack([values, values]))
+
         box_df = {}
-        for country in df_dict.keys():
-            monthly_agg = df_dict[country].groupby('month').agg([
-                ('min', 'min'), ('max', 'max'), ('mean', 'mean'), ('median', 'median'),
-                ('q25', lambda x: x.quantile(0.25)), ('q75', lambda x: x.quantile(0.75))
-            ])
-            yearly_agg = df_dict[country].drop(columns=['date', 'month']).groupby(lambda x: True).agg([
-                ('min', 'min'), ('max', 'max'), ('mean', 'mean'), ('median', 'median'),
-                ('q25', lambda x: x.quantile(0.25)), ('q75', lambda x: x.quantile(0.75))
-            ])
-            yearly_agg.index = pd.Index([13], name='month')
-            combined_df = pd.concat([monthly_agg, yearly_agg])
-            combined_df = combined_df.reset_index()
-            combined_df['month_name'] = combined_df['month'].apply(lambda x: MONTHS[x])
-            box_df[country] = combined_df
+        bounds = np.r_[segment_starts(keys // 14), len(keys)]
+        for i in range(len(bounds) - 1):
+            rows = slice(bounds[i], bounds[i + 1])
+            combined_df = summary_frame(stats, rows, value_cols, index=pd.RangeIndex(bounds[i + 1] - bounds[i]))
+            combined_df.insert(0, 'month', keys[rows] % 14)
+            combined_df['month_name'] = combined_df['month'].map(MONTHS)
+            box_df[locations[keys[bounds[i]] // 14]] = combined_df
 
         return df_dict, box_df, REGION, COUNTRY_NAME, loss_data
 
+    # Loss curves of every trial written by TRF/sweep.py; reloaded when the store changes
+    @st.cache_data
+    def load_sweep_results(path, mtime):
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+            trials = pd.read_sql_query(
+                "SELECT trial, sweep, config, status, best_val FROM trials WHERE best_val IS NOT NULL "
+                "ORDER BY best_val", conn)
+            curves = pd.read_sql_query("SELECT trial, epoch, train_loss, val_loss FROM curves ORDER BY trial, epoch", conn)
+        configs = [json.loads(c) for c in trials['config']]
+        trials['label'] = [f"#{t} dim={c['embed_dim']} heads={c['num_heads']} layers={c['num_layers']} "
+                           f"pos={c['num_pos']} ({status})"
+                           for t, c, status in zip(trials['trial'], configs, trials['status'])]
+        return trials, curves
+
+    # The trained EncoderOnly (or its TorchScript export), loaded once per process and keyed by the file's content hash
+    @st.cache_resource
+    def load_forecast_model(model_path, checkpoint_hash):
+        return forecast_service.load_model(model_path)
+
+    # Predictions for every location from batched forward passes
+    @st.cache_resource
+    def forecast_all(model_path, checkpoint_hash):
+        model, meta = load_forecast_model(model_path, checkpoint_hash)
+        return forecast_service.predict(model, meta, load_and_process_data()[0])
+
+    @st.cache_data
+    def forecast(model_path, checkpoint_hash, location):
+        return forecast_all(model_path, checkpoint_hash)[location]
+
+    # Per-location, per-month errors, persisted to Parquet per model version
+    @st.cache_data
+    def load_backtest(model_path, checkpoint_hash):
+        split = forecast_service.checkpoint_meta(model_path).get("split")
+        return backtest.load_or_run(checkpoint_hash, lambda: forecast_all(model_path, checkpoint_hash), split)
+
+    # Baseline vs perturbed predictions, cached per (model version, scenario spec)
+    @st.cache_data
+    def run_scenario(model_path, checkpoint_hash, spec):
+        model, meta = load_forecast_model(model_path, checkpoint_hash)
+        frames, _, regions, countries, _ = load_and_process_data()
+        # Country locations are named "country (region)"
+        location_regions = {name: name.rsplit(' (', 1)[-1][:-1] for name in countries}
+        location_regions.update({reg: reg for reg in regions})
+        return scenarios.run(model, meta, frames, location_regions, spec)
+
     df_dict, box_df, REGION, COUNTRY_NAME, loss_data = load_and_process_data()
 
     VARIABLE_LABELS = {
@@ -216,4 +281,150 @@ def run():
             xaxis_range=[-0.2,40.2],
             legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
         )
-        st.plotly_chart(fig4, use_container_width=True)
\ No newline at end of file
+        st.plotly_chart(fig4, use_container_width=True)
+
+    if os.path.exists('sweep_results.sqlite'):
+        trials, curves = load_sweep_results('sweep_results.sqlite', os.path.getmtime('sweep_results.sqlite'))
+        with st.container(border=True):
+            st.markdown("<h2>Hyperparameter Sweep</h2>", unsafe_allow_html=True)
+            st.markdown("<p>Validation loss per epoch for each configuration, best first.</p>",
+                        unsafe_allow_html=True)
+            sweeps = list(dict.fromkeys(trials['sweep']))
+            selected_sweep = st.selectbox("Select a Sweep", options=sweeps, key="sweep") if sweeps else None
+            sweep_trials = trials[trials['sweep'] == selected_sweep]
+            selected_trials = st.multiselect("Select Configurations", options=list(sweep_trials['label']),
+                                             default=list(sweep_trials['label'][:5]), key="trials")
+            fig5 = go.Figure()
+            for trial, label in zip(sweep_trials['trial'], sweep_trials['label']):
+                if label in selected_trials:
+                    curve = curves[curves['trial'] == trial]
+                    fig5.add_trace(go.Scatter(x=curve['epoch'], y=curve['val_loss'], mode='lines+markers', name=label))
+            fig5.update_yaxes(fixedrange=True)
+            fig5.update_layout(
+                title={'text': 'Validation Loss per Configuration', 'x': 0.5, 'xanchor': 'center'},
+                xaxis_title='Epoch',
+                yaxis_title='Validation Loss',
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+            )
+            st.plotly_chart(fig5, use_container_width=True)
+
+    with st.container(border=True):
+        st.markdown("<h2>Transformer Encoder Forecast</h2>", unsafe_allow_html=True)
+        st.markdown("<p>Select a location and a disease to compare the model's predictions with the reported cases.</p>",
+                    unsafe_allow_html=True)
+        model_path = forecast_service.model_path()
+        if model_path is None:
+            st.info("No trained model found. Run `python TRF/train.py` to create TRF/PredTRF.")
+        else:
+            col7, col8 = st.columns(2)
+            with col7:
+                selected_location5 = st.selectbox("Select a Location", options=ALL_LOCATIONS, index=15,
+                                                  key="loc5", format_func=format_location)
+            with col8:
+                selected_variable5 = st.selectbox("Select a Disease", options=list(forecast_service.PREDICTED),
+                                                  format_func=lambda x: VARIABLE_LABELS[x], key="var5")
+            predicted = forecast(str(model_path), data_catalog.file_hash(model_path), selected_location5)
+            fig6 = go.Figure()
+            colors = ['#1f77b4', '#ff7f0e']
+            fig6.add_trace(go.Scatter(x=predicted['date'], y=predicted[selected_variable5], mode='lines+markers',
+                                      name='Actual', marker=dict(color=colors[0])))
+            fig6.add_trace(go.Scatter(x=predicted['date'], y=predicted[forecast_service.PREDICTED[selected_variable5]],
+                                      mode='lines+markers', name='Predicted', marker=dict(color=colors[1])))
+            fig6.update_yaxes(title_text=VARIABLE_LABELS[selected_variable5], fixedrange=True)
+            fig6.update_layout(
+                title={'text': f"Predicted vs. Actual {VARIABLE_LABELS[selected_variable5]} in {selected_location5}",
+                       'x': 0.5, 'xanchor': 'center'},
+                template='plotly_white',
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+            )
+            st.plotly_chart(fig6, use_container_width=True)
+
+    if model_path is not None:
+        with st.container(border=True):
+            st.markdown("<h2>Forecast Error Heatmap</h2>", unsafe_allow_html=True)
+            st.markdown("<p>Backtest error of the model for every selected location, by calendar month or by year. "
+                        "By default only windows held out from training are scored.</p>",
+                        unsafe_allow_html=True)
+            errors = load_backtest(str(model_path), data_catalog.file_hash(model_path))
+            col9, col10, col11, col12 = st.columns(4)
+            with col9:
+                selected_variable6 = st.selectbox("Select a Disease", options=list(forecast_service.PREDICTED),
+                                                  format_func=lambda x: VARIABLE_LABELS[x], key="var6")
+            with col10:
+                selected_metric = st.selectbox("Select a Metric", options=list(backtest.METRICS),
+                                               format_func=str.upper, key="metric6")
+            with col11:
+                selected_by = st.selectbox("Group By", options=['month', 'year'], format_func=str.capitalize, key="by6")
+            with col12:
+                selected_split = st.selectbox("Windows", options=list(backtest.SPLITS),
+                                              format_func={'test': 'Held-out (test)', 'train': 'Training',
+                                                           'all': 'All'}.get, key="split6")
+            selected_locations6 = st.multiselect("Select Locations", options=ALL_LOCATIONS, default=sorted(REGION),
+                                                 format_func=format_location, key="loc6")
+            if not selected_locations6:
+                st.info("Please select at least one location to see the heatmap.")
+            else:
+                matrix = backtest.error_matrix(errors, selected_variable6, selected_metric, selected_by,
+                                               selected_locations6, selected_split)
+                month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+                x_labels = [month_names[m - 1] for m in matrix.columns] if selected_by == 'month' else list(matrix.columns)
+                fig7 = go.Figure(data=go.Heatmap(z=matrix.to_numpy(), x=x_labels, y=list(matrix.index),
+                                                 colorscale='RdBu_r' if selected_metric == 'bias' else 'Viridis',
+                                                 zmid=0 if selected_metric == 'bias' else None,
+                                                 colorbar_title=selected_metric.upper()))
+                fig7.update_layout(
+                    title={'text': f"{selected_metric.upper()} of Predicted {VARIABLE_LABELS[selected_variable6]}",
+                           'x': 0.5, 'xanchor': 'center'},
+                    height=max(400, 30 * len(matrix)),
+                    template='plotly_white'
+                )
+                st.plotly_chart(fig7, use_container_width=True)
+
+    if model_path is not None:
+        with st.container(border=True):
+            st.markdown("<h2>What-if Scenario</h2>", unsafe_allow_html=True)
+            st.markdown("<p>Perturb one climate variable and see how the model's predicted cases change.</p>",
+                        unsafe_allow_html=True)
+            col12, col13, col14, col15 = st.columns(4)
+            with col12:
+                scenario_region = st.selectbox("Region", options=['All'] + sorted(REGION), key="scenario_region")
+            with col13:
+                scenario_variable = st.selectbox("Variable", options=['avg_temp_c', 'precipitation_mm',
+                                                                      'air_quality_index', 'uv_index'],
+                                                 format_func=lambda x: VARIABLE_LABELS[x], key="scenario_var")
+            with col14:
+                scenario_operation = st.selectbox("Change", options=['add', 'scale'],
+                                                  format_func=lambda x: {'add': 'Add', 'scale': 'Scale by %'}[x],
+                                                  key="scenario_op")
+            with col15:
+                scenario_amount = st.number_input("Amount", value=1.0 if scenario_operation == 'add' else -20.0,
+                                                  step=0.5 if scenario_operation == 'add' else 5.0, key="scenario_amount")
+            amount = scenario_amount if scenario_operation == 'add' else 1 + scenario_amount / 100
+            spec = scenarios.normalize([(scenario_variable, scenario_operation, amount,
+                                         None if scenario_region == 'All' else scenario_region)])
+            result = run_scenario(str(model_path), data_catalog.file_hash(model_path), spec)
+            affected = result if scenario_region == 'All' else result[result['region'] == scenario_region]
+
+            # Region rows are means over their countries, so the totals count countries only
+            countries = affected[affected['location'] != affected['region']]
+            metric_cols = st.columns(len(forecast_service.PREDICTED))
+            for metric_col, target in zip(metric_cols, forecast_service.PREDICTED):
+                rows = countries[countries['target'] == target]
+                base, new = rows['baseline'].sum(), rows['scenario'].sum()
+                metric_col.metric(f"Predicted {VARIABLE_LABELS[target]} per month", f"{new:,.1f}",
+                                  f"{new - base:+,.1f} ({(new - base) / abs(base) * 100 if base else 0:+.1f}%)")
+
+            colors = ['#1f77b4', '#ff7f0e']
+            fig8 = go.Figure()
+            for i, target in enumerate(forecast_service.PREDICTED):
+                rows = affected[affected['target'] == target]
+                fig8.add_trace(go.Bar(x=rows['location'], y=rows['change'], name=VARIABLE_LABELS[target],
+                                      marker=dict(color=colors[i])))
+            fig8.update_yaxes(title_text="Change in predicted cases per month", fixedrange=True)
+            fig8.update_layout(
+                title={'text': "Change in Predicted Cases by Location", 'x': 0.5, 'xanchor': 'center'},
+                barmode='group',
+                template='plotly_white',
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+            )
+            st.plotly_chart(fig8, use_container_width=True)
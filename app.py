@@ -1,13 +1,10 @@
+import logging
 import streamlit as st
-import suyamoon_bird_migration
-import imran_climate_trends
-import chaitanya
-import anirban
-import garvit
-import kirandeep
-import kameshwor
+import page_registry
 import streamlit.components.v1 as components  # Only needed for iframe embedding
 
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
 st.set_page_config(layout="wide", page_title="Combined Multi-App Explorer")
 
 st.sidebar.title("Select App")
@@ -25,18 +22,6 @@ app_choice = st.sidebar.radio(
     )
 )
 
-# Map app names to their run functions
-app_cases = {
-    "Imran's Task": imran_climate_trends.run,
-    "Suyamoon's Task": suyamoon_bird_migration.run,
-    "Chaitanya's Task": chaitanya.run,
-    "Anirban's Task": anirban.run,
-    "Vijiyant and Garvit's Task": garvit.run,
-    "Kirandeep's Task": kirandeep.run,
-    "Kameshwor's Task": kameshwor.run
-    # Add more mappings here as needed
-}
-
 if app_choice == "Insha's Task":
     # Option 1: Open in a new tab (recommended)
     st.markdown(
@@ -49,8 +34,12 @@ if app_choice == "Insha's Task":
     )
 
 else:
-    app_func = app_cases.get(app_choice)
+    # Page modules are imported on first selection (see page_registry.PAGES)
+    app_func = page_registry.get_page(app_choice)
     if app_func:
         app_func()
     else:
         st.error("Selected app is not available.")
+
+# Import the other pages in the background once this one has rendered
+page_registry.warm_pages()
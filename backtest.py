@@ -0,0 +1,106 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_catalog
+import forecast_service
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_DIR = data_catalog.CACHE_DIR.parent / "backtests"
+# Which windows error_matrix scores by default: the ones held out from training
+SPLITS = ("test", "train", "all")
+METRICS = {
+    "mae": lambda error: error.abs(),
+    "bias": lambda error: error,
+    "rmse": lambda error: error ** 2,
+}
+
+
+def split_table(split=None):
+    """Train/test membership of every (location, year, month) window, named like the dashboard's locations.
+
+    `split` holds window_data.split_table's block/test_fraction/seed, as
+    saved in the checkpoint meta; missing values fall back to its defaults.
+    """
+    window_data = forecast_service.trf_module("window_data")
+    table = window_data.split_table(data_catalog.load("climate_disease"), **(split or {}))
+    # window_data names countries "country(region)", the dashboard "country (region)"
+    table["location"] = table["location"].str.replace("(", " (", n=1, regex=False)
+    return table
+
+
+def error_table(predictions, split=None):
+    """Long per-(location, month, target) table of actual vs predicted cases in original units.
+
+    `predictions` is forecast_service.predict's {location: frame} output.
+    The boolean `test` column marks windows held out from training (see split_table).
+    """
+    parts = []
+    for target, predicted in forecast_service.PREDICTED.items():
+        for location, frame in predictions.items():
+            parts.append(pd.DataFrame({
+                "location": location,
+                "date": frame["date"].to_numpy(),
+                "target": target,
+                "actual": frame[target].to_numpy(dtype=np.float32),
+                "predicted": frame[predicted].to_numpy(dtype=np.float32),
+            }))
+    table = pd.concat(parts, ignore_index=True)
+    table["location"] = table["location"].astype("category")
+    table["target"] = table["target"].astype("category")
+    table["year"] = table["date"].dt.year.astype(np.int16)
+    table["month"] = table["date"].dt.month.astype(np.int8)
+    table["error"] = table["predicted"] - table["actual"]
+    held_out = split_table(split)
+    keys = pd.MultiIndex.from_arrays([table["location"].astype(str), table["year"], table["month"]])
+    test = held_out.set_index(["location", "year", "month"])["test"]
+    table["test"] = test.reindex(keys).fillna(False).to_numpy(dtype=bool)
+    return table
+
+
+def load_or_run(model_hash, predict, split=None):
+    """The backtest table for a model version, read from its Parquet file or computed with predict() and saved.
+
+    Files are keyed by the model's and the dataset's content hashes.
+    """
+    data_hash = data_catalog.file_hash(data_catalog.DATASETS["climate_disease"]["path"])
+    path = BACKTEST_DIR / f"{model_hash}-{data_hash}.parquet"
+    try:
+        table = pd.read_parquet(path)
+        # Tables saved before the split column was added are rebuilt
+        if "test" in table:
+            return table
+    except FileNotFoundError:
+        pass
+    except ImportError:
+        return error_table(predict(), split)
+
+    table = error_table(predict(), split)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    table.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    logger.info("Saved backtest of %d rows to %s", len(table), path)
+    return table
+
+
+def error_matrix(table, target, metric="mae", by="month", locations=None, split="test"):
+    """Location x month (1-12) or location x year matrix of one error metric for one target.
+
+    Only held-out windows are scored unless split is "train" or "all".
+    """
+    rows = table[table["target"] == target]
+    if split != "all":
+        rows = rows[rows["test"] == (split == "test")]
+    if locations:
+        rows = rows[rows["location"].isin(locations)]
+    values = METRICS[metric](rows["error"].astype(np.float64))
+    matrix = values.groupby([rows["location"], rows[by]], observed=True).mean().unstack(by)
+    if metric == "rmse":
+        matrix = np.sqrt(matrix)
+    if locations:
+        matrix = matrix.reindex([loc for loc in locations if loc in matrix.index])
+    return matrix
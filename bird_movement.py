@@ -0,0 +1,260 @@
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_catalog
+from group_stats import grouped_mode
+
+logger = logging.getLogger(__name__)
+
+MOVEMENT_DIR = data_catalog.CACHE_DIR.parent / "movement"
+EARTH_RADIUS_M = 6_371_008.8
+STEP_COLUMNS = ["step_m", "dt_s", "ground_speed", "bearing"]
+
+# A fix is "stationary" when the bird covered less than this since the previous fix
+STOP_SPEED = 1.0  # m/s
+STOP_HOURS = 12
+# Moving stretches shorter than this (local foraging trips) that stay within STOP_KM
+# of where the bird was resting do not break a stationary run
+GAP_HOURS = 3
+STOP_KM = 5
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres, elementwise."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing in degrees clockwise from north (0-360), elementwise."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+def track_starts(track):
+    """Boolean mask of the first fix of every track in a track-sorted id array."""
+    track = np.asarray(track)
+    return np.r_[True, track[1:] != track[:-1]] if len(track) else np.zeros(0, dtype=bool)
+
+
+def step_metrics(lat, lon, time_ns, track):
+    """Distance (m), time delta (s), ground speed (m/s) and bearing of the step into every fix.
+
+    Fixes must be sorted by track, then time; the first fix of each track
+    has no previous fix and gets NaN.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    seconds = np.asarray(time_ns).astype("datetime64[ns]").astype(np.int64) / 1e9
+    first = track_starts(track)
+    out = {name: np.full(len(lat), np.nan) for name in STEP_COLUMNS}
+    if len(lat) < 2:
+        return out
+    prev_lat, prev_lon = lat[:-1], lon[:-1]
+    step = haversine(prev_lat, prev_lon, lat[1:], lon[1:])
+    dt = np.diff(seconds)
+    out["step_m"][1:] = step
+    out["dt_s"][1:] = dt
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["ground_speed"][1:] = np.where(dt > 0, step / dt, np.nan)
+    out["bearing"][1:] = bearing(prev_lat, prev_lon, lat[1:], lon[1:])
+    for column in out.values():
+        column[first] = np.nan
+    return out
+
+
+def runs(flags, track):
+    """Run-length encoding of a boolean array, with runs also broken at track changes.
+
+    Returns (starts, ends, values): run i covers fixes starts[i]:ends[i].
+    """
+    flags = np.asarray(flags, dtype=bool)
+    if not len(flags):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=bool)
+    change = track_starts(track)
+    change[1:] |= flags[1:] != flags[:-1]
+    starts = np.flatnonzero(change)
+    ends = np.r_[starts[1:], len(flags)]
+    return starts, ends, flags[starts]
+
+
+def movement_frame(birddata):
+    """The bird fixes sorted by bird and time, with the step metrics as extra columns."""
+    stamps = birddata["date_time"].dt.tz_convert(None).to_numpy()
+    order = np.lexsort((stamps, birddata["bird_name"].cat.codes.to_numpy()))
+    frame = birddata.iloc[order].reset_index(drop=True)
+    steps = step_metrics(frame["latitude"], frame["longitude"], stamps[order], frame["bird_name"].cat.codes)
+    return frame.assign(**{name: values.astype(np.float32) for name, values in steps.items()})
+
+
+def load_or_run(name="bird_migration"):
+    """movement_frame of a catalog dataset, read from or saved to Parquet keyed by the file's content hash."""
+    spec = data_catalog.DATASETS[name]
+    path = MOVEMENT_DIR / f"{name}-{data_catalog.file_hash(spec['path'])}.parquet"
+    try:
+        return pd.read_parquet(path)
+    except FileNotFoundError:
+        pass
+    except ImportError:
+        return movement_frame(data_catalog.load(name))
+
+    frame = movement_frame(data_catalog.load(name))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    logger.info("Saved movement metrics for %d fixes to %s", len(frame), path)
+    return frame
+
+
+def segments(frame, stop_speed=STOP_SPEED, stop_hours=STOP_HOURS, gap_hours=GAP_HOURS, stop_km=STOP_KM):
+    """Split every track into flight and stopover segments.
+
+    Consecutive fixes reached at under stop_speed form a stationary run.
+    A moving stretch shorter than gap_hours is folded into it when every
+    fix of the stretch, and the fix after it, stays within stop_km of the
+    last stationary fix before it. A run lasting at least stop_hours is a
+    stopover, and everything between stopovers is flight (short pauses
+    stay inside their flight). Returns one row per segment with its bird,
+    kind, time span, duration, fix count, distance covered (the step
+    between two segments counts towards the earlier one, so a track's
+    segments add up to its length), mean position and dominant country.
+    """
+    track = frame["bird_name"].cat.codes.to_numpy()
+    speed = frame["ground_speed"].to_numpy()
+    stamps = frame["date_time"].dt.tz_convert(None).to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+    lat = frame["latitude"].to_numpy(dtype=np.float64)
+    lon = frame["longitude"].to_numpy(dtype=np.float64)
+    n = len(track)
+
+    # Stationary runs, with short local moving runs folded in, long enough to count as stopovers
+    starts, ends, slow = runs(speed < stop_speed, track)
+    hours = (stamps[ends - 1] - stamps[starts]) / 3.6e12
+    # Anchor: the stationary fix just before a moving run, in the same track
+    anchor = np.maximum(starts - 1, 0)
+    has_anchor = (starts > 0) & (track[anchor] == track[starts])
+    reach = haversine(np.repeat(lat[anchor], ends - starts), np.repeat(lon[anchor], ends - starts), lat, lon)
+    reach = np.maximum.reduceat(reach, starts) if n else reach
+    after = np.minimum(ends, n - 1)
+    reach_after = np.where((ends < n) & (track[after] == track[starts]),
+                           haversine(lat[anchor], lon[anchor], lat[after], lon[after]), 0.0)
+    local = has_anchor & (np.maximum(reach, reach_after) <= stop_km * 1000)
+    slow = np.repeat(slow | ((hours < gap_hours) & local), ends - starts)
+    starts, ends, slow = runs(slow, track)
+    hours = (stamps[ends - 1] - stamps[starts]) / 3.6e12
+    stop = slow & (hours >= stop_hours)
+    is_stop = np.repeat(stop, ends - starts)
+
+    # Merge the rest into flights, then number every segment
+    starts, ends, kind = runs(is_stop, track)
+    segment = np.repeat(np.arange(len(starts)), ends - starts)
+    sizes = ends - starts
+    # The step into a segment's first fix belongs to the segment before it
+    step = np.nan_to_num(frame["step_m"].to_numpy(dtype=np.float64))
+    inside = step.copy()
+    inside[starts] = 0.0
+    distance = np.add.reduceat(inside, starts) if len(starts) else np.zeros(0)
+    if len(starts) > 1:
+        same_track = track[starts[1:]] == track[starts[:-1]]
+        distance[:-1] += np.where(same_track, step[starts[1:]], 0.0)
+    country = frame["country"].cat
+
+    out = pd.DataFrame({
+        "bird_name": pd.Categorical.from_codes(track[starts], frame["bird_name"].cat.categories),
+        "kind": np.where(kind, "stopover", "flight"),
+        "start": frame["date_time"].iloc[starts].reset_index(drop=True),
+        "end": frame["date_time"].iloc[ends - 1].reset_index(drop=True),
+        "fixes": sizes,
+        "distance_km": distance / 1000,
+        "latitude": np.add.reduceat(lat, starts) / sizes if len(starts) else np.zeros(0),
+        "longitude": np.add.reduceat(lon, starts) / sizes if len(starts) else np.zeros(0),
+        "country": pd.Categorical.from_codes(grouped_mode(segment, country.codes, len(starts)), country.categories),
+    })
+    out["hours"] = (out["end"] - out["start"]).dt.total_seconds() / 3600
+    return out
+
+
+def _synthetic(n_birds, fixes, seed=0):
+    # Random-walk tracks with long pauses, fixes every 30 minutes
+    rng = np.random.default_rng(seed)
+    n = n_birds * fixes
+    moving = np.repeat(rng.random(n // 48 + 1) < 0.6, 48)[:n]
+    lat = 50 + np.cumsum(np.where(moving, rng.normal(0, 0.02, n), rng.normal(0, 1e-5, n)))
+    lon = 3 + np.cumsum(np.where(moving, rng.normal(0, 0.02, n), rng.normal(0, 1e-5, n)))
+    stamps = pd.Timestamp("2013-08-15", tz="UTC") + pd.to_timedelta(np.tile(np.arange(fixes) * 1800, n_birds), unit="s")
+    return pd.DataFrame({
+        "bird_name": pd.Categorical(np.repeat([f"bird{i}" for i in range(n_birds)], fixes)),
+        "date_time": stamps,
+        "latitude": lat,
+        "longitude": lon,
+        "country": pd.Categorical(np.where(lat > 40, "Europe", "Africa")),
+    })
+
+
+def _check():
+    # Against a per-row Python haversine on a small sample
+    rng = np.random.default_rng(0)
+    lat1, lon1, lat2, lon2 = rng.uniform(-80, 80, 4 * 1000).reshape(4, -1)
+    got = haversine(lat1, lon1, lat2, lon2)
+    ref = []
+    for a, b, c, d in zip(lat1, lon1, lat2, lon2):
+        a, b, c, d = map(np.radians, (a, b, c, d))
+        h = np.sin((c - a) / 2) ** 2 + np.cos(a) * np.cos(c) * np.sin((d - b) / 2) ** 2
+        ref.append(2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(h)))
+    print(f"haversine max relative error {np.max(np.abs(got - ref) / np.array(ref)):.1e}")
+    print(f"Brussels -> Dakar {haversine(50.85, 4.35, 14.69, -17.44) / 1000:.0f} km, "
+          f"bearing {bearing(50.85, 4.35, 14.69, -17.44):.0f}°")
+
+    # A day of southward flight at ~10 m/s with a slow fix every 2 h is one flight, not a stopover
+    fixes = 49
+    lat = 50 - np.cumsum(np.where(np.arange(fixes) % 4 == 3, 0.001, 0.162))
+    flight = pd.DataFrame({
+        "bird_name": pd.Categorical(["bird"] * fixes),
+        "date_time": pd.Timestamp("2013-08-15", tz="UTC") + pd.to_timedelta(np.arange(fixes) * 1800, unit="s"),
+        "latitude": lat,
+        "longitude": np.full(fixes, 3.0),
+        "country": pd.Categorical(["France"] * fixes),
+    })
+    table = segments(movement_frame(flight))
+    assert (table["kind"] == "flight").all(), table
+    # Segment distances add up to the track length
+    frame = movement_frame(_synthetic(3, 5000))
+    table = segments(frame)
+    total = frame.groupby("bird_name", observed=True)["step_m"].sum() / 1000
+    assert np.allclose(table.groupby("bird_name", observed=True)["distance_km"].sum(), total, rtol=1e-4)
+    print(f"segments: flight check ok, {len(table)} segments add up to {total.sum():.0f} km")
+
+
+def _bench(sizes):
+    for n in sizes:
+        birds = _synthetic(10, n // 10)
+        start = time.perf_counter()
+        frame = movement_frame(birds)
+        middle = time.perf_counter()
+        table = segments(frame)
+        end = time.perf_counter()
+        print(f"n={n:>10}  steps {middle - start:6.2f}s  segments {end - middle:6.2f}s  "
+              f"stopovers {(table['kind'] == 'stopover').sum()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the bird movement metrics and stopover segmentation.")
+    parser.add_argument("--bench", type=int, nargs="*", default=[62_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+    _check()
+    _bench(args.bench)
+
+
+if __name__ == "__main__":
+    main()
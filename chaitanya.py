@@ -1,11 +1,11 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import data_catalog
 
 def run():
     # Load dataset
-    data = pd.read_csv("chaitanya_climate_change_dataset.csv")
+    data = data_catalog.load("chaitanya_climate_change")
 
     st.title("Climate Impact Dashboard")
     st.markdown(
@@ -47,7 +47,7 @@ def run():
         )
 
         anim_data['Weighted CO2'] = anim_data['CO2 Emissions (Tons/Capita)'] * anim_data['Population']
-        anim_grouped = anim_data.groupby(['Year', 'Country']).agg({
+        anim_grouped = anim_data.groupby(['Year', 'Country'], observed=True).agg({
             'Avg Temperature (°C)': 'mean',
             'Weighted CO2': 'sum',
             'Population': 'sum',
@@ -89,8 +89,8 @@ def run():
             "Yearly global trends of temperature and population-weighted CO₂ emissions to highlight potential correlations."
         )
 
-        data["Weighted CO2"] = data["CO2 Emissions (Tons/Capita)"] * data["Population"]
-        co2_weighted = data.groupby("Year").agg({
+        weighted = data.assign(**{"Weighted CO2": data["CO2 Emissions (Tons/Capita)"] * data["Population"]})
+        co2_weighted = weighted.groupby("Year").agg({
             "Weighted CO2": "sum",
             "Population": "sum",
             "Avg Temperature (°C)": "mean"
@@ -170,7 +170,7 @@ def run():
         forest_data['Weighted CO2'] = forest_data['CO2 Emissions (Tons/Capita)'] * forest_data['Population']
 
         # Step 2: Group by Year & Country and aggregate
-        forest_grouped = forest_data.groupby(['Year', 'Country']).agg({
+        forest_grouped = forest_data.groupby(['Year', 'Country'], observed=True).agg({
             'Forest Area (%)': 'mean',               # avg forest cover if multiple entries
             'Weighted CO2': 'sum',
             'Population': 'sum',
@@ -233,7 +233,7 @@ def run():
 
         forest_renew_data['Weighted CO2'] = forest_renew_data['CO2 Emissions (Tons/Capita)'] * forest_renew_data['Population']
 
-        forest_renew_grouped = forest_renew_data.groupby(['Year', 'Country']).agg({
+        forest_renew_grouped = forest_renew_data.groupby(['Year', 'Country'], observed=True).agg({
             'Forest Area (%)': 'max',
             'Renewable Energy (%)': 'max',
             'Weighted CO2': 'sum',
@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+OCEAN = "Ocean"
+NAME_FIELDS = ["ADMIN", "NAME", "NAME_EN", "name", "admin", "country"]
+CHUNK = 200_000
+
+# Per-worker index, built once by _init_worker
+_tree = None
+
+
+def load_countries(path, name_field=None):
+    """Country names and polygons from a local GeoJSON file (or any format geopandas reads).
+
+    Returns (names, geometries), one entry per feature; the name comes from
+    `name_field` or the first of NAME_FIELDS the features carry.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".geojson", ".json"):
+        features = json.loads(path.read_text())["features"]
+        properties = [f["properties"] or {} for f in features]
+        geometries = shapely.from_geojson([json.dumps(f["geometry"]) for f in features])
+    else:
+        try:
+            import geopandas
+        except ImportError:
+            raise ImportError(f"Reading {path.suffix} files needs geopandas; convert to GeoJSON or install it") from None
+        frame = geopandas.read_file(path)
+        properties = frame.drop(columns="geometry").to_dict("records")
+        geometries = frame.geometry.to_numpy()
+    field = name_field or next((f for f in NAME_FIELDS if properties and f in properties[0]), None)
+    if field is None:
+        raise ValueError(f"No country name field in {path}; pass name_field (one of {list(properties[0])})")
+    return [p[field] for p in properties], np.asarray(geometries, dtype=object)
+
+
+def _init_worker(wkb):
+    global _tree
+    geometries = shapely.from_wkb(wkb)
+    shapely.prepare(geometries)
+    _tree = shapely.STRtree(geometries)
+
+
+def _label_chunk(lon, lat):
+    # Index of the first polygon containing each point, -1 for none
+    points = shapely.points(lon, lat)
+    point_idx, geom_idx = _tree.query(points, predicate="intersects")
+    codes = np.full(len(lon), -1, dtype=np.int32)
+    # Points on a shared border hit several polygons; the lowest polygon index wins
+    order = np.lexsort((geom_idx, point_idx))
+    point_idx, geom_idx = point_idx[order], geom_idx[order]
+    first = np.r_[True, point_idx[1:] != point_idx[:-1]] if len(point_idx) else np.zeros(0, dtype=bool)
+    codes[point_idx[first]] = geom_idx[first]
+    return codes
+
+
+def label_points(lon, lat, names, geometries, workers=None, chunk=CHUNK):
+    """Country of every (lon, lat) point as a categorical, 'Ocean' where no polygon contains it.
+
+    Polygons go into an STRtree, so each point is only tested against the
+    few polygons whose bounding boxes contain it. Points are labeled in
+    chunks across a process pool; each worker builds its own tree once.
+    Points with missing coordinates are left missing.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    bounds = range(0, len(lon), chunk)
+    wkb = shapely.to_wkb(np.asarray(geometries, dtype=object))
+
+    if workers == 1 or len(bounds) <= 1:
+        _init_worker(wkb)
+        parts = [_label_chunk(lon[i:i + chunk], lat[i:i + chunk]) for i in bounds]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(min(workers, len(bounds)), mp_context=ctx, initializer=_init_worker,
+                                 initargs=(wkb,)) as pool:
+            parts = list(pool.map(_label_chunk, [lon[i:i + chunk] for i in bounds], [lat[i:i + chunk] for i in bounds]))
+    geom_codes = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+
+    # Several features may share a country name; label by name, with Ocean last
+    name_codes, countries = pd.factorize(pd.Series(names, dtype=object))
+    codes = np.where(geom_codes >= 0, name_codes[geom_codes], len(countries))
+    codes[np.isnan(lon) | np.isnan(lat)] = -1
+    return pd.Categorical.from_codes(codes, list(countries) + [OCEAN])
+
+
+def label_file(source, countries, out, name_field=None, workers=None, chunk=CHUNK):
+    """Add a `country` column to a bird GPS CSV and write it as CSV or Parquet (by `out`'s suffix)."""
+    df = pd.read_csv(source)
+    if df.columns[0].startswith("Unnamed: 0"):
+        # Keep the source's row index, as bird_migration_with_country.csv does
+        df = df.set_index(df.columns[0]).rename_axis(None)
+    names, geometries = load_countries(countries, name_field)
+    start = time.perf_counter()
+    df["country"] = label_points(df["longitude"], df["latitude"], names, geometries, workers, chunk)
+    logger.info("Labeled %d fixes against %d polygons in %.1fs", len(df), len(names), time.perf_counter() - start)
+    if Path(out).suffix == ".parquet":
+        df.to_parquet(out)
+    else:
+        df.to_csv(out)
+    return df
+
+
+def _synthetic_countries(n, seed=0):
+    # Voronoi cells over western Europe and Africa, with a third of them dropped as "sea"
+    rng = np.random.default_rng(seed)
+    seeds = shapely.multipoints(np.c_[rng.uniform(-20, 15, n), rng.uniform(5, 55, n)])
+    cells = shapely.get_parts(shapely.voronoi_polygons(seeds, extend_to=shapely.box(-20, 5, 15, 55)))
+    cells = shapely.intersection(cells, shapely.box(-20, 5, 15, 55))
+    keep = rng.random(len(cells)) > 1 / 3
+    return [f"Country {i}" for i in range(keep.sum())], cells[keep]
+
+
+def _bench(sizes, workers):
+    names, geometries = _synthetic_countries(60)
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        lon, lat = rng.uniform(-20, 15, n), rng.uniform(5, 55, n)
+        start = time.perf_counter()
+        labels = label_points(lon, lat, names, geometries, workers)
+        seconds = time.perf_counter() - start
+        print(f"n={n:>10}  {seconds:7.2f}s  {n / seconds:12.0f} points/s  ocean {np.mean(labels == OCEAN):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label bird GPS fixes with the country polygon containing them (Ocean otherwise).")
+    parser.add_argument("source", nargs="?", help="GPS CSV with latitude/longitude columns, e.g. bird_tracking.csv")
+    parser.add_argument("countries", nargs="?", help="country polygons, GeoJSON (or a shapefile with geopandas)")
+    parser.add_argument("--out", default="bird_migration_with_country.csv", help=".csv or .parquet")
+    parser.add_argument("--name-field", help="feature property holding the country name")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    parser.add_argument("--bench", type=int, nargs="*", help="time labeling this many random points instead")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.bench is not None:
+        _bench(args.bench or [62_000, 1_000_000, 5_000_000], args.workers)
+        return
+    if not (args.source and args.countries):
+        parser.error("source and countries are required unless --bench is given")
+    df = label_file(args.source, args.countries, args.out, args.name_field, args.workers, args.chunk)
+    counts = df["country"].value_counts()
+    print(counts[counts > 0].to_string())
+    print(f"Wrote {len(df)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
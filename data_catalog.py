@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columnar copies of the CSVs live here, named by content hash + schema
+CACHE_DIR = Path(os.environ.get("DATASET_CACHE_DIR", ".cache/datasets"))
+
+CLIMATE_CHANGE_DTYPES = {
+    "Year": "int16",
+    "Country": "category",
+    "Avg Temperature (°C)": "float32",
+    "CO2 Emissions (Tons/Capita)": "float32",
+    "Sea Level Rise (mm)": "float32",
+    "Rainfall (mm)": "float32",
+    # Populations run past 2**24, so they keep full precision
+    "Population": "float64",
+    "Renewable Energy (%)": "float32",
+    "Extreme Weather Events": "float32",
+    "Forest Area (%)": "float32",
+}
+
+CLIMATE_DISEASE_DTYPES = {
+    "year": "int16",
+    "month": "int8",
+    "country": "category",
+    "region": "category",
+    "avg_temp_c": "float32",
+    "precipitation_mm": "float32",
+    "air_quality_index": "float32",
+    "uv_index": "float32",
+    "malaria_cases": "int32",
+    "dengue_cases": "int32",
+    "population_density": "int32",
+    "healthcare_budget": "int32",
+}
+
+# name -> how to read it; every page asks for its data by name.
+# GlobalLandTemperaturesByCountry.csv is streamed by land_temperature_store instead.
+DATASETS = {
+    "climate_change": dict(path="climate_change_dataset.csv", dtypes=CLIMATE_CHANGE_DTYPES),
+    "chaitanya_climate_change": dict(path="chaitanya_climate_change_dataset.csv", dtypes=CLIMATE_CHANGE_DTYPES),
+    "imran_df_filled": dict(path="imran_df_filled.csv", dtypes=CLIMATE_CHANGE_DTYPES),
+    "climate_disease": dict(path="climate_disease_dataset.csv", dtypes=CLIMATE_DISEASE_DTYPES),
+    "global_temperatures": dict(
+        path="GlobalTemperatures.csv",
+        dtypes={
+            "LandAverageTemperature": "float32",
+            "LandAverageTemperatureUncertainty": "float32",
+            "LandMaxTemperature": "float32",
+            "LandMaxTemperatureUncertainty": "float32",
+            "LandMinTemperature": "float32",
+            "LandMinTemperatureUncertainty": "float32",
+            "LandAndOceanAverageTemperature": "float32",
+            "LandAndOceanAverageTemperatureUncertainty": "float32",
+        },
+    ),
+    "bird_migration": dict(
+        path="bird_migration_with_country.csv",
+        dtypes={
+            "bird_name": "category",
+            "country": "category",
+            "device_info_serial": "int16",
+            "direction": "float32",
+            "speed_2d": "float32",
+        },
+        parse_dates={"date_time": dict(utc=True)},
+    ),
+}
+
+_lock = threading.Lock()
+_file_hashes = {}
+_tables = {}
+_current = {}
+
+
+def file_hash(path):
+    """Content hash of a file, recomputed only when its size or mtime changes."""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _file_hashes[key] = digest
+    return digest
+
+
+def _schema_hash(spec):
+    text = repr(sorted(spec["dtypes"].items())) + repr(sorted(spec.get("parse_dates", {}).items()))
+    return hashlib.sha1(text.encode()).hexdigest()[:8]
+
+
+def _parse_csv(spec):
+    df = pd.read_csv(spec["path"], dtype=spec["dtypes"])
+    for col, kwargs in spec.get("parse_dates", {}).items():
+        df[col] = pd.to_datetime(df[col], **kwargs)
+    return df
+
+
+def _read_or_build(spec, cache_file):
+    if cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception:
+            logger.warning("Ignoring unreadable dataset cache %s", cache_file, exc_info=True)
+
+    df = _parse_csv(spec)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, cache_file)
+    except ImportError:
+        # No parquet engine installed: keep the parsed frame in memory only
+        logger.info("No parquet engine available, not caching %s on disk", spec["path"])
+    except OSError:
+        logger.warning("Could not write dataset cache %s", cache_file, exc_info=True)
+    return df
+
+
+def load(name):
+    """Return the shared in-memory table for a catalog dataset.
+
+    The same DataFrame object is handed to every caller for a given file
+    version, so treat it as read-only and copy or assign() before adding columns.
+    """
+    spec = DATASETS[name]
+    key = (file_hash(spec["path"]), _schema_hash(spec))
+    df = _tables.get(key)
+    if df is not None and _current.get(name) == key:
+        return df
+    with _lock:
+        df = _tables.get(key)
+        if df is None:
+            cache_file = CACHE_DIR / f"{key[0]}-{key[1]}.parquet"
+            df = _read_or_build(spec, cache_file)
+            _tables[key] = df
+            logger.info("Loaded dataset %s (%d rows) from %s", name, len(df), spec["path"])
+        # Drop the previous version of this file once nothing else shares it
+        old = _current.get(name)
+        _current[name] = key
+        if old is not None and old != key and old not in _current.values():
+            _tables.pop(old, None)
+    return df
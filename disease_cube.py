@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+
+def _year_slice(years, year_range):
+    start = int(np.searchsorted(years, year_range[0], side="left"))
+    stop = int(np.searchsorted(years, year_range[1], side="right"))
+    return start, max(start, stop)
+
+
+def _country_rows(country_index, countries):
+    # An empty selection means every country, as in the page's multiselects
+    if not countries:
+        return np.arange(len(country_index))
+    return np.array([country_index[c] for c in countries if c in country_index], dtype=np.int64)
+
+
+def _prefix(a):
+    # Cumulative sums along the year axis (axis 1) with a leading zero slab
+    return np.pad(np.cumsum(a, axis=1), ((0, 0), (1, 0)) + ((0, 0),) * (a.ndim - 2))
+
+
+def _grid_codes(df, country_col, year_col):
+    codes, countries = pd.factorize(df[country_col], sort=True)
+    year = df[year_col].to_numpy().astype(np.int64)
+    years = np.arange(int(year.min()), int(year.max()) + 1)
+    return codes, list(countries), year - years[0], years
+
+
+class DiseaseCube:
+    """Country x year x month sums and counts with prefix sums along the year axis.
+
+    Any (country subset, year range) query is answered from the prefix sums
+    in time proportional to the number of countries selected, not the number
+    of rows in the source table.
+    """
+
+    def __init__(self, countries, years, variables, sums, counts):
+        self.countries = list(countries)
+        self.years = np.asarray(years)
+        self.variables = list(variables)
+        self.country_index = {c: i for i, c in enumerate(self.countries)}
+        self.var_index = {v: i for i, v in enumerate(self.variables)}
+        # sums/counts: (country, year, month, variable)
+        self.sums = sums
+        self.counts = counts
+        self.prefix_sums = _prefix(sums)
+        self.prefix_counts = _prefix(counts)
+
+    @classmethod
+    def from_frame(cls, df, variables, country_col="country", year_col="year", month_col="month"):
+        codes, countries, year_codes, years = _grid_codes(df, country_col, year_col)
+        month = df[month_col].to_numpy().astype(np.int64) - 1
+        shape = (len(countries), len(years), 12)
+        flat = np.ravel_multi_index((codes, year_codes, month), shape)
+        size = int(np.prod(shape))
+
+        sums = np.zeros(shape + (len(variables),))
+        counts = np.zeros(shape + (len(variables),), dtype=np.int64)
+        for k, var in enumerate(variables):
+            values = df[var].to_numpy().astype(np.float64)
+            valid = ~np.isnan(values)
+            sums[..., k] = np.bincount(flat[valid], weights=values[valid], minlength=size).reshape(shape)
+            counts[..., k] = np.bincount(flat[valid], minlength=size).reshape(shape)
+        return cls(countries, years, variables, sums, counts)
+
+    def _year_slice(self, year_range):
+        return _year_slice(self.years, year_range)
+
+    def _rows(self, countries):
+        return _country_rows(self.country_index, countries)
+
+    def range_totals(self, countries, year_range):
+        """(sums, counts) per month and variable for the selection, each shape (12, variables)."""
+        rows = self._rows(countries)
+        start, stop = self._year_slice(year_range)
+        sums = (self.prefix_sums[rows, stop] - self.prefix_sums[rows, start]).sum(axis=0)
+        counts = (self.prefix_counts[rows, stop] - self.prefix_counts[rows, start]).sum(axis=0)
+        return sums, counts
+
+    def row_count(self, countries, year_range):
+        """Number of source rows in the selection (an empty list selects every country)."""
+        _, counts = self.range_totals(countries, year_range)
+        return int(counts.max(axis=1).sum()) if counts.size else 0
+
+    def seasonal(self, countries, year_range, variables):
+        """Monthly means like df.groupby('month')[variables].mean().reset_index()."""
+        sums, counts = self.range_totals(countries, year_range)
+        cols = [self.var_index[v] for v in variables]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums[:, cols] / counts[:, cols]
+        out = pd.DataFrame(means, columns=variables)
+        out.insert(0, "month", np.arange(1, 13))
+        return out[counts[:, cols].max(axis=1) > 0].reset_index(drop=True)
+
+    def surface(self, country, year_range, variable):
+        """Year x month means for one country, like pivot_table(index='year', columns='month')."""
+        i = self.country_index[country]
+        k = self.var_index[variable]
+        start, stop = self._year_slice(year_range)
+        sums = self.sums[i, start:stop, :, k]
+        counts = self.counts[i, start:stop, :, k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        pivot = pd.DataFrame(means, index=pd.Index(self.years[start:stop], name="year"),
+                             columns=pd.Index(np.arange(1, 13), name="month"))
+        return pivot.dropna(how="all").dropna(axis=1, how="all")
+
+
+class CorrelationCube:
+    """Per-(country, year) sufficient statistics for a Pearson correlation matrix.
+
+    Stores n, sum(x) and sum(x x^T) of the (globally centred) variables with
+    prefix sums along the year axis, so the matrix for any country subset and
+    year range is assembled without touching the rows again.
+    """
+
+    def __init__(self, countries, years, variables, shift, n, sx, sxx):
+        self.countries = list(countries)
+        self.years = np.asarray(years)
+        self.variables = list(variables)
+        self.country_index = {c: i for i, c in enumerate(self.countries)}
+        self.shift = shift
+        self.prefix_n = _prefix(n)
+        self.prefix_sx = _prefix(sx)
+        self.prefix_sxx = _prefix(sxx)
+
+    @classmethod
+    def from_frame(cls, df, variables, country_col="country", year_col="year"):
+        codes, countries, year_codes, years = _grid_codes(df, country_col, year_col)
+        shape = (len(countries), len(years))
+        flat = np.ravel_multi_index((codes, year_codes), shape)
+        size = shape[0] * shape[1]
+        values = df[variables].to_numpy(dtype=np.float64)
+        # Centring keeps sum(x x^T) well conditioned for the n*sxx - sx*sx subtraction
+        shift = values.mean(axis=0)
+        values = values - shift
+
+        k = len(variables)
+        n = np.bincount(flat, minlength=size).reshape(shape)
+        sx = np.zeros(shape + (k,))
+        sxx = np.zeros(shape + (k, k))
+        for i in range(k):
+            sx[..., i] = np.bincount(flat, weights=values[:, i], minlength=size).reshape(shape)
+            for j in range(i, k):
+                sxx[..., i, j] = np.bincount(flat, weights=values[:, i] * values[:, j], minlength=size).reshape(shape)
+                sxx[..., j, i] = sxx[..., i, j]
+        return cls(countries, years, variables, shift, n, sx, sxx)
+
+    def matrix(self, countries, year_range):
+        """Pearson matrix (variables x variables) for the selection; zeros if it is empty."""
+        rows = _country_rows(self.country_index, countries)
+        start, stop = _year_slice(self.years, year_range)
+        n = (self.prefix_n[rows, stop] - self.prefix_n[rows, start]).sum()
+        if n == 0:
+            return np.zeros((len(self.variables), len(self.variables)))
+        sx = (self.prefix_sx[rows, stop] - self.prefix_sx[rows, start]).sum(axis=0)
+        sxx = (self.prefix_sxx[rows, stop] - self.prefix_sxx[rows, start]).sum(axis=0)
+        cov = n * sxx - np.outer(sx, sx)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+        return np.clip(corr, -1, 1)
@@ -0,0 +1,127 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+
+def bandwidth_factor(n, d, bw_method="scott"):
+    """Kernel scale factor with the same rules as scipy.stats.gaussian_kde."""
+    if bw_method == "scott":
+        return n ** (-1.0 / (d + 4))
+    if bw_method == "silverman":
+        return (n * (d + 2) / 4.0) ** (-1.0 / (d + 4))
+    return float(bw_method)
+
+
+def linear_bin(x, y, xgrid, ygrid):
+    """Spread unit weights onto a regular grid with bilinear (cloud-in-cell) weights.
+
+    Returns counts shaped (len(ygrid), len(xgrid)) to match np.meshgrid(xgrid, ygrid).
+    """
+    nx, ny = len(xgrid), len(ygrid)
+    dx = (xgrid[-1] - xgrid[0]) / (nx - 1) if nx > 1 else 1.0
+    dy = (ygrid[-1] - ygrid[0]) / (ny - 1) if ny > 1 else 1.0
+    gx = (np.asarray(x, dtype=np.float64) - xgrid[0]) / (dx or 1.0)
+    gy = (np.asarray(y, dtype=np.float64) - ygrid[0]) / (dy or 1.0)
+    ix = np.clip(np.floor(gx).astype(np.int64), 0, max(nx - 2, 0))
+    iy = np.clip(np.floor(gy).astype(np.int64), 0, max(ny - 2, 0))
+    fx = np.clip(gx - ix, 0.0, 1.0)
+    fy = np.clip(gy - iy, 0.0, 1.0)
+
+    size = nx * ny
+    counts = np.zeros(size)
+    for ox, wx in ((0, 1 - fx), (1, fx)):
+        for oy, wy in ((0, 1 - fy), (1, fy)):
+            flat = np.minimum(iy + oy, ny - 1) * nx + np.minimum(ix + ox, nx - 1)
+            counts += np.bincount(flat, weights=wx * wy, minlength=size)
+    return counts.reshape(ny, nx)
+
+
+def kde_grid(x, y, xgrid, ygrid, bw_method="scott"):
+    """Gaussian KDE of the points (x, y) evaluated on the mesh of xgrid x ygrid.
+
+    Approximates scipy.stats.gaussian_kde([x, y])([X.ravel(), Y.ravel()])
+    (full data covariance, same bandwidth rules) by binning the points onto
+    the grid and convolving with the sampled kernel via FFT, so the cost is
+    O(N + G log G) instead of O(N * G). Returns an array shaped
+    (len(ygrid), len(xgrid)).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    xgrid = np.asarray(xgrid, dtype=np.float64)
+    ygrid = np.asarray(ygrid, dtype=np.float64)
+    n = len(x)
+
+    factor = bandwidth_factor(n, 2, bw_method)
+    cov = np.cov(np.vstack([x, y])) * factor ** 2
+    inv_cov = np.linalg.inv(cov)  # raises LinAlgError for degenerate data, like scipy
+    norm = 2 * np.pi * np.sqrt(np.linalg.det(cov))
+
+    nx, ny = len(xgrid), len(ygrid)
+    dx = (xgrid[-1] - xgrid[0]) / (nx - 1) if nx > 1 else 0.0
+    dy = (ygrid[-1] - ygrid[0]) / (ny - 1) if ny > 1 else 0.0
+    # Kernel sampled at every grid offset the convolution can reach
+    ox = np.arange(-(nx - 1), nx) * dx
+    oy = np.arange(-(ny - 1), ny) * dy
+    OX, OY = np.meshgrid(ox, oy)
+    quad = inv_cov[0, 0] * OX ** 2 + 2 * inv_cov[0, 1] * OX * OY + inv_cov[1, 1] * OY ** 2
+    kernel = np.exp(-0.5 * quad) / norm
+
+    counts = linear_bin(x, y, xgrid, ygrid)
+    density = fftconvolve(counts, kernel, mode="same") / n
+    # FFT round-off can leave tiny negatives far from the data
+    return np.maximum(density, 0.0)
+
+
+# Largest allowed |binned - exact| on the grid, relative to the exact density's peak
+TOLERANCE = 1e-2
+
+
+def _check(n, seed=0, tolerance=TOLERANCE):
+    """Compare kde_grid with scipy.stats.gaussian_kde on a 100x100 grid; raises AssertionError past tolerance."""
+    from scipy import stats
+
+    rng = np.random.default_rng(seed)
+    x = rng.normal(25, 5, n)
+    y = 0.8 * x * 4 + rng.gamma(2.0, 40.0, n)
+    xg = np.linspace(x.min(), x.max(), 100)
+    yg = np.linspace(y.min(), y.max(), 100)
+    X, Y = np.meshgrid(xg, yg)
+    for bw in ("scott", "silverman"):
+        ref = stats.gaussian_kde([x, y], bw_method=bw)([X.ravel(), Y.ravel()]).reshape(X.shape)
+        got = kde_grid(x, y, xg, yg, bw)
+        err = np.abs(got - ref).max() / ref.max()
+        print(f"n={n:>8} bw={bw:<9} max error / peak = {err:.2e}")
+        if not err < tolerance:
+            raise AssertionError(f"kde_grid is {err:.2e} of the peak away from scipy (n={n}, bw={bw})")
+
+
+def _bench(sizes):
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        x = rng.normal(25, 5, n)
+        y = rng.normal(150, 60, n)
+        xg = np.linspace(x.min(), x.max(), 100)
+        yg = np.linspace(y.min(), y.max(), 100)
+        start = time.perf_counter()
+        kde_grid(x, y, xg, yg)
+        print(f"n={n:>9}  {time.perf_counter() - start:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fast_kde against scipy and time it.")
+    parser.add_argument("--check", type=int, nargs="*", default=[1000, 34560],
+                        help="sample sizes to compare against scipy.stats.gaussian_kde")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="largest allowed max error / peak; the check fails above it")
+    parser.add_argument("--bench", type=int, nargs="*", default=[10_000, 100_000, 1_000_000, 5_000_000],
+                        help="sample sizes to time on a 100x100 grid")
+    args = parser.parse_args()
+    for n in args.check:
+        _check(n, tolerance=args.tolerance)
+    _bench(args.bench)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import data_catalog
+
+TRF_DIR = Path(__file__).resolve().parent / "TRF"
+CHECKPOINT = TRF_DIR / "PredTRF"
+# int8 and float TorchScript exports of CHECKPOINT written by TRF/quantize.py
+QUANTIZED = TRF_DIR / "PredTRF.int8.pt"
+FROZEN = TRF_DIR / "PredTRF.frozen.pt"
+PREDICTED = {'malaria_cases': 'predicted_malaria_cases', 'dengue_cases': 'predicted_dengue_cases'}
+
+
+def trf_module(name):
+    """Import a module from TRF/ (the model code is not a package and its notebooks run from inside TRF/)."""
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, TRF_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def checkpoint_meta(checkpoint=CHECKPOINT):
+    """The <checkpoint>.json written by TRF/train.py, or None for checkpoints saved without it."""
+    path = Path(f"{checkpoint}.json")
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def model_path():
+    """The fastest artifact exported from the current checkpoint, else the float checkpoint.
+
+    Artifacts are compared by the "seconds" quantize.py timed at export;
+    int8 is not always faster than float on a given CPU. An artifact whose
+    recorded source hash differs from the checkpoint on disk (the model was
+    retrained since) is skipped, and one without a timing is only used when
+    there is no checkpoint. None if nothing is usable.
+    """
+    checkpoint = CHECKPOINT if CHECKPOINT.exists() and checkpoint_meta(CHECKPOINT) is not None else None
+    best, best_seconds = checkpoint, None
+    for path in (FROZEN, QUANTIZED):
+        meta = checkpoint_meta(path) if path.exists() else None
+        if meta is None or (checkpoint is not None and meta.get("source_sha1") != data_catalog.file_hash(checkpoint)):
+            continue
+        seconds = meta.get("seconds")
+        if best is None or (seconds is not None and (best_seconds is None or seconds < best_seconds)):
+            best, best_seconds = path, seconds
+    return best
+
+
+def load_model(checkpoint=CHECKPOINT):
+    """EncoderOnly in eval mode with its weights memory-mapped from the checkpoint, plus its meta.
+
+    A TorchScript artifact (.pt) from TRF/quantize.py is loaded as is.
+    """
+    import torch
+
+    meta = checkpoint_meta(checkpoint)
+    if Path(checkpoint).suffix == ".pt":
+        return torch.jit.load(str(checkpoint), map_location="cpu").eval(), meta
+    cfg = meta["model"]
+    model = trf_module("EnchoderTRF").EncoderOnly(cfg["vocabSize"], cfg["embedDim"], cfg["numHeads"],
+                                                   cfg["numLayers"], cfg["numPosEmbeading"])
+    state = torch.load(checkpoint, map_location="cpu", mmap=True, weights_only=True)
+    # assign=True keeps the memory-mapped tensors instead of copying them into fresh parameters
+    model.load_state_dict(state, assign=True)
+    return model.eval(), meta
+
+
+def stack_frames(frames, columns):
+    """One (rows, columns) float32 array for a {location: frame} dict, plus the location offsets."""
+    values = np.concatenate([frame[columns].to_numpy(dtype=np.float32) for frame in frames.values()])
+    offsets = np.r_[0, np.cumsum([len(frame) for frame in frames.values()])]
+    return values, offsets
+
+
+def location_windows(values, offsets, window, mean=0.0, std=1.0):
+    """Every window of every location of a stacked series as one strided tensor.
+
+    The series is zero-padded per location and scaled once with
+    (x - mean) / std; the windows are an unfold() view over that, so nothing
+    is copied per window. Returns (view, starts), where view[starts[i]] is
+    the window ending at stacked row i.
+    """
+    import torch
+
+    window_data = trf_module("window_data")
+    series = (window_data.padded(values, offsets, window) - mean) / std
+    view = torch.from_numpy(np.ascontiguousarray(series, dtype=np.float32)).unfold(0, window, 1).transpose(1, 2)
+    return view, window_data.window_starts(offsets, window)
+
+
+def predict_series(model, meta, values, offsets, batch_size=4096):
+    """Predicted targets (original units) for every row of a stacked feature series, shape (rows, targets).
+
+    The prediction for a row is the model output at the last position of
+    the window ending at it. batch_size=None runs every window in a single pass.
+    """
+    import torch
+
+    n_features = len(meta["features"])
+    mean, std = np.asarray(meta["mean"], np.float32), np.asarray(meta["std"], np.float32)
+    view, starts = location_windows(values, offsets, meta["window"], mean[:n_features], std[:n_features])
+
+    with torch.inference_mode():
+        # Windows are gathered from the strided view one chunk at a time
+        chunks = np.array_split(starts, range(batch_size, len(starts), batch_size)) if batch_size else [starts]
+        out = torch.cat([model(view[torch.from_numpy(chunk)])[:, -1] for chunk in chunks])
+    return out.numpy() * std[n_features:] + mean[n_features:]
+
+
+def predict(model, meta, frames, batch_size=4096):
+    """Predicted vs actual cases for every location, in large batched forward passes.
+
+    Returns {location: DataFrame with date, the actual target columns and
+    predicted_* columns}.
+    """
+    targets = meta["targets"]
+    values, offsets = stack_frames(frames, meta["features"])
+    predicted = predict_series(model, meta, values, offsets, batch_size)
+
+    result = {}
+    for i, (location, frame) in enumerate(frames.items()):
+        block = predicted[offsets[i]:offsets[i + 1]]
+        out_frame = frame[['date'] + targets].reset_index(drop=True)
+        for j, target in enumerate(targets):
+            out_frame[PREDICTED.get(target, f"predicted_{target}")] = block[:, j]
+        result[location] = out_frame
+    return result
@@ -0,0 +1,122 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+def _rows(cube, axis):
+    # Lay the fill axis out contiguously as the last axis of a 2-D (series, step) array
+    moved = np.moveaxis(np.asarray(cube, dtype=np.float64), axis, -1)
+    return np.ascontiguousarray(moved).reshape(-1, moved.shape[-1]), moved.shape
+
+
+def interpolate_linear(cube, axis=1):
+    """Linear interpolation over NaN gaps along one axis, matching pandas' interpolate().
+
+    Leading gaps stay NaN and trailing gaps repeat the last valid value.
+    """
+    rows, shape = _rows(cube, axis)
+    n = rows.shape[1]
+    flat = rows.ravel()
+    valid = ~np.isnan(flat)
+
+    # For every gap, find the nearest valid neighbours in the flattened array
+    # and keep only those that lie in the same series
+    known = np.flatnonzero(valid)
+    gap = np.flatnonzero(~valid)
+    if len(known) == 0 or len(gap) == 0:
+        return np.moveaxis(rows.reshape(shape), -1, axis).copy()
+    k = np.cumsum(valid, dtype=np.int32)[gap]  # valid values before each gap
+    row_start = gap - gap % n
+    prev = known[k - 1]  # k == 0 wraps to the last value, rejected below
+    keep = (k > 0) & (prev >= row_start)
+    gap, prev, row_start, k = gap[keep], prev[keep], row_start[keep], k[keep]
+    nxt = known[np.minimum(k, len(known) - 1)]
+    # Trailing gaps repeat the previous value
+    nxt = np.where(nxt > gap, nxt, prev)
+    nxt = np.where(nxt < row_start + n, nxt, prev)
+
+    out = rows.copy()
+    v_prev = flat[prev]
+    out.ravel()[gap] = v_prev + (flat[nxt] - v_prev) * ((gap - prev) / np.maximum(nxt - prev, 1))
+    return np.moveaxis(out.reshape(shape), -1, axis)
+
+
+def fill_mean(cube, axis=1):
+    """Replace NaN gaps with the mean of the valid values along one axis."""
+    rows, shape = _rows(cube, axis)
+    valid = ~np.isnan(rows)
+    total = np.where(valid, rows, 0.0).sum(axis=1, keepdims=True)
+    count = valid.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    return np.moveaxis(np.where(valid, rows, mean).reshape(shape), -1, axis)
+
+
+def pct_change(cube, axis=1):
+    """Percentage change between consecutive steps along one axis (first step is NaN)."""
+    cube = np.moveaxis(np.asarray(cube, dtype=np.float64), axis, 0)
+    out = np.full(cube.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[1:] = (cube[1:] / cube[:-1] - 1) * 100
+    return np.moveaxis(out, 0, axis)
+
+
+FILLERS = {"linear": interpolate_linear, "mean": fill_mean}
+
+
+def fill_country_years(df, agg="mean", method="linear", growth=None,
+                       country_col="Country", year_col="Year"):
+    """Aggregate df to one row per (country, year) and fill the full country x year grid.
+
+    Every numeric column is aggregated with `agg`, laid out as a
+    (country, year, column) cube covering every year between the first and
+    last one in the data, and gaps are filled along the year axis with
+    `method` ("linear" or "mean"). `growth` maps a column to the name of a
+    percentage-change column computed from the filled values.
+    Returns a frame sorted by country and year.
+    """
+    value_cols = [c for c in df.select_dtypes(include="number").columns if c != year_col]
+    grouped = df.groupby([country_col, year_col], observed=True, sort=False)[value_cols].agg(agg)
+
+    country_codes, countries = pd.factorize(grouped.index.get_level_values(country_col), sort=True)
+    year_values = grouped.index.get_level_values(year_col).to_numpy()
+    first_year, last_year = int(year_values.min()), int(year_values.max())
+    years = np.arange(first_year, last_year + 1)
+
+    cube = np.full((len(countries), len(years), len(value_cols)), np.nan)
+    cube[country_codes, year_values - first_year] = grouped.to_numpy(dtype=np.float64)
+    cube = FILLERS[method](cube, axis=1)
+
+    year_dtype = df[year_col].dtype
+    out = pd.DataFrame({
+        year_col: np.tile(years, len(countries)).astype(year_dtype),
+        country_col: pd.Categorical.from_codes(np.repeat(np.arange(len(countries)), len(years)),
+                                               categories=countries),
+    })
+    flat = cube.reshape(-1, len(value_cols))
+    for i, col in enumerate(value_cols):
+        out[col] = flat[:, i]
+    for col, name in (growth or {}).items():
+        out[name] = pct_change(cube[:, :, value_cols.index(col)], axis=1).ravel()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill every country x year gap in a climate CSV.")
+    parser.add_argument("--source", default="chaitanya_climate_change_dataset.csv")
+    parser.add_argument("--out", default="imran_df_filled.csv")
+    parser.add_argument("--agg", default="mean")
+    parser.add_argument("--method", default="mean", choices=sorted(FILLERS))
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.source)
+    filled = fill_country_years(df, agg=args.agg, method=args.method)
+    # Same column order as imran_df_filled.csv
+    cols = ["Country", "Year"] + [c for c in filled.columns if c not in ("Country", "Year")]
+    filled[cols].to_csv(args.out, index=False)
+    print(f"Wrote {len(filled)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
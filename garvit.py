@@ -1,10 +1,11 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.graph_objs as go
 import seaborn as sns
 import warnings
+import data_catalog
+import land_temperature_store
 
 def run():
     warnings.filterwarnings('ignore')
@@ -16,34 +17,26 @@ def run():
 
     st.title("Global Temperature Analysis Dashboard")
 
-    @st.cache_data
-    def load_country_data():
-        df = pd.read_csv("GlobalLandTemperaturesByCountry.csv")
-        drop = ['Denmark', 'Antarctica', 'France', 'Europe', 'Netherlands', 
-                'United Kingdom', 'Africa', 'South America']
-        df = df[~df.Country.isin(drop)].replace({
-            'Denmark (Europe)': 'Denmark',
-            'France (Europe)': 'France',
-            'Netherlands (Europe)': 'Netherlands',
-            'United Kingdom (Europe)': 'United Kingdom'
-        })
-        df['Year'] = pd.to_datetime(df.dt).dt.year.astype(str)
-        return df
+    @st.cache_resource
+    def load_country_cube():
+        # Streamed once into a binary column store; restarts reuse it
+        return land_temperature_store.load_cube("GlobalLandTemperaturesByCountry.csv")
 
     @st.cache_data
     def load_global_data():
-        df = pd.read_csv("GlobalTemperatures.csv")
-        df['Year'] = pd.to_datetime(df.dt).dt.year.astype(str)
+        df = data_catalog.load("global_temperatures").copy()
+        df['Year'], df['month'] = land_temperature_store.parse_dates(df.dt.to_numpy())
         return df
 
-    country_df = load_country_data()
+    # Every country chart below is a slice of this country x year x month cube
+    cube = load_country_cube()
     global_df = load_global_data()
 
     # 1. Global temperature map
     st.header("1) Average land temperature in countries")
 
-    countries = country_df.Country.unique()
-    mean_temp = [country_df[country_df.Country == c].AverageTemperature.mean() for c in countries]
+    countries = cube.countries
+    mean_temp = cube.country_means()
 
     choropleth = dict(
         type="choropleth",
@@ -90,9 +83,10 @@ def run():
     # 3. Global average temperature trend
     st.header("3) Average land temperature in world")
 
-    years = sorted(global_df.Year.unique())
-    mean_world = [global_df[global_df.Year == y].LandAverageTemperature.mean() for y in years]
-    unc_world = [global_df[global_df.Year == y].LandAverageTemperatureUncertainty.mean() for y in years]
+    world = global_df.groupby('Year')[['LandAverageTemperature', 'LandAverageTemperatureUncertainty']].mean()
+    years = list(world.index)
+    mean_world = world['LandAverageTemperature'].to_numpy()
+    unc_world = world['LandAverageTemperatureUncertainty'].to_numpy()
 
     trace0 = go.Scatter(
         x=years,
@@ -135,8 +129,7 @@ def run():
     decade_years = sorted([str(y) for y in range(1750, 2014, 10)])
     selected_decade = st.selectbox("Select Decade", decade_years)
 
-    df_decade = country_df[country_df['Year'] == selected_decade]
-    mean_temp_decade = [df_decade[df_decade['Country'] == c]['AverageTemperature'].mean() for c in countries]
+    mean_temp_decade = cube.year_means(int(selected_decade))
 
     choropleth_decade = dict(
         type="choropleth",
@@ -165,16 +158,8 @@ def run():
     st.header("5) Annual temperature changes on the continents")
 
     continent = ['Russia', 'United States', 'Niger', 'Greenland', 'Australia', 'Bolivia']
-    years_all = sorted(country_df['Year'].unique())
-    years_plot = years_all[70:]
-
-    mean_temp_by_cont = np.zeros((len(continent), len(years_plot)))
-
-    for j, c in enumerate(continent):
-        sub = country_df[country_df['Country'] == c]
-        for i, yr in enumerate(years_plot):
-            vals = sub[sub['Year'] == yr]['AverageTemperature']
-            mean_temp_by_cont[j, i] = vals.mean() if not vals.empty else np.nan
+    years_plot = cube.years[70:]
+    mean_temp_by_cont = cube.yearly_means(continent)[:, 70:]
 
     colors = ['rgb(0,255,255)', 'rgb(255,0,255)', 'rgb(0,0,0)', 
             'rgb(255,0,0)', 'rgb(0,255,0)', 'rgb(0,0,255)']
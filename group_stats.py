@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+STATS = ["min", "max", "mean", "median", "q25", "q75"]
+
+
+def segment_starts(sorted_keys):
+    """Start offsets of the runs of equal values in an already sorted key array."""
+    sorted_keys = np.asarray(sorted_keys)
+    if len(sorted_keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+
+
+def _quantile(values, starts, counts, q):
+    # Linear interpolation between order statistics, as in Series.quantile()
+    pos = starts + q * np.maximum(counts - 1, 0)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, starts + np.maximum(counts - 1, 0))
+    frac = pos - lo
+    return values[lo] + (values[hi] - values[lo]) * frac
+
+
+def grouped_summary(keys, values):
+    """min/max/mean/median/q25/q75 of every column of `values` per distinct integer key.
+
+    Each column is sorted once by (key, value) so every group is a
+    contiguous, ordered segment and all statistics are read off with index
+    arithmetic instead of one Python callback per group. NaNs are skipped
+    like pandas does. Returns (unique keys, {stat: array (groups, columns)}).
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    uniq, group = np.unique(keys, return_inverse=True)
+    group_starts = segment_starts(np.sort(group))
+    out = {name: np.full((len(uniq), values.shape[1]), np.nan) for name in STATS}
+
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        # NaNs sort to the end of each key's segment
+        ordered = column[np.lexsort((column, group))]
+        valid = ~np.isnan(ordered)
+        counts = np.add.reduceat(valid.astype(np.int64), group_starts)
+        totals = np.add.reduceat(np.where(valid, ordered, 0.0), group_starts)
+        has = counts > 0
+        starts, counts = group_starts[has], counts[has]
+        out["min"][has, j] = ordered[starts]
+        out["max"][has, j] = ordered[starts + counts - 1]
+        out["mean"][has, j] = totals[has] / counts
+        out["median"][has, j] = _quantile(ordered, starts, counts, 0.5)
+        out["q25"][has, j] = _quantile(ordered, starts, counts, 0.25)
+        out["q75"][has, j] = _quantile(ordered, starts, counts, 0.75)
+    return uniq, out
+
+
+def summary_frame(stats, rows, columns, index):
+    """Lay selected rows of a grouped_summary result out with (column, stat) MultiIndex columns."""
+    data = {(col, name): stats[name][rows, j] for j, col in enumerate(columns) for name in STATS}
+    return pd.DataFrame(data, index=index)
+
+
+def grouped_mode(groups, codes, n_groups=None):
+    """Most frequent non-negative code per group; ties go to the smallest code, -1 if a group has none.
+
+    Same result as Series.mode().iloc[0] per group on a categorical (with
+    -1 for missing), from one count over the (group, code) pairs instead
+    of a Python call per group.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    codes = np.asarray(codes, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+    valid = codes >= 0
+    n_codes = int(codes.max()) + 1 if valid.any() else 1
+    pairs, counts = np.unique(groups[valid] * n_codes + codes[valid], return_counts=True)
+    pair_group, pair_code = pairs // n_codes, pairs % n_codes
+    # Per group: highest count first, then smallest code
+    order = np.lexsort((pair_code, -counts, pair_group))
+    first = segment_starts(pair_group[order])
+    out = np.full(n_groups, -1, dtype=np.int64)
+    out[pair_group[order][first]] = pair_code[order][first]
+    return out
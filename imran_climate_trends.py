@@ -3,6 +3,7 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.subplots as sp
+import data_catalog
 
 def run():
     # Streamlit page configuration
@@ -10,8 +11,7 @@ def run():
 
 
     # Load Dataset 
-    dataset_path = "imran_df_filled.csv"
-    df = pd.read_csv(dataset_path)
+    df = data_catalog.load("imran_df_filled")
     df = df.dropna(subset=["Country", "Year"])
     df["Year"] = pd.to_numeric(df["Year"], errors='coerce')  # Convert Year to numeric; if invalid, set as NaN (missing)
     df = df[df["Year"].between(2000, 2023)]
@@ -72,7 +72,7 @@ def run():
         
         df_trend = df.dropna(subset=["CO2 Emissions (Tons/Capita)"])
         df_trend = df_trend[df_trend["Year"].between(2000, 2023)]
-        country_avg = df_trend.groupby(["Country", "Year"], as_index=False)["CO2 Emissions (Tons/Capita)"].mean()
+        country_avg = df_trend.groupby(["Country", "Year"], as_index=False, observed=True)["CO2 Emissions (Tons/Capita)"].mean()
 
         country_list = sorted(country_avg["Country"].unique())
         fig2 = go.Figure()
@@ -125,7 +125,7 @@ def run():
         st.title("Impact of Forest Area on Climate Metrics")
         st.markdown("Choose a country to view how forest coverage relates to key climate indicators over time.")
 
-        grouped_df = df.groupby(['Country', 'Year'], as_index=False).mean(numeric_only=True)
+        grouped_df = df.groupby(['Country', 'Year'], as_index=False, observed=True).mean(numeric_only=True)
 
         selected_country = st.selectbox("Select a Country", sorted(grouped_df["Country"].unique()), key="country_selector_tab3")
         country_df = grouped_df[grouped_df["Country"] == selected_country]
@@ -193,7 +193,7 @@ def run():
         temp_max = df_temp["Avg Temperature (°C)"].max()
 
         # Group by country and year to get average temperature
-        temp_grouped = df_temp.groupby(["Country", "Year"], as_index=False)["Avg Temperature (°C)"].mean()
+        temp_grouped = df_temp.groupby(["Country", "Year"], as_index=False, observed=True)["Avg Temperature (°C)"].mean()
 
     
         temp_grouped["Year"] = temp_grouped["Year"].astype(str)
@@ -1,51 +1,23 @@
 import streamlit as st 
-import pandas as pd
 import plotly.express as px
 import matplotlib.pyplot as plt
 import seaborn as sns
+import data_catalog
+import gap_fill
 
 def run():
     # Set layout
     st.set_page_config(page_title="Climate Dashboard", layout="wide")
-    # Load dataset
-    df = pd.read_csv('climate_change_dataset.csv')
-    # Prepare grouped data(avg and Max)
-    df_sorted = df.sort_values(by=['Country', 'Year'])
-    df_avg = df_sorted.groupby(['Country', 'Year']).mean(numeric_only=True).reset_index()
-    df_agg = df_sorted.groupby(['Country', 'Year']).max(numeric_only=True).reset_index()
-
-    # Interpolation for Sea Level (filled_data)
-    all_years = pd.Series(range(df_avg['Year'].min(), df_avg['Year'].max() + 1))
-    numeric_cols = df_avg.columns.drop(['Country', 'Year'])
-
-    filled_data = pd.DataFrame()
-    for country in df_avg['Country'].unique():
-        country_data = df_avg[df_avg['Country'] == country].set_index('Year')
-        country_data = country_data.reindex(all_years)
-        country_data['Country'] = country
-        country_data[numeric_cols] = country_data[numeric_cols].interpolate()
-        country_data = country_data.reset_index().rename(columns={'index': 'Year'})
-        filled_data = pd.concat([filled_data, country_data], ignore_index=True)
-
-    filled_data = filled_data.sort_values(by=['Country', 'Year']).reset_index(drop=True)
-
-    #Interpolation for Population (filled_data1)
-    all_years = pd.Series(range(df_agg['Year'].min(), df_agg['Year'].max() + 1))
-    numeric_cols = df_agg.columns.drop(['Country', 'Year'])
-
-    filled_data1 = pd.DataFrame()
-    for country in df_agg['Country'].unique():
-        country_data = df_agg[df_agg['Country'] == country].set_index('Year')
-        country_data = country_data.reindex(all_years)
-        country_data['Country'] = country
-        country_data[numeric_cols] = country_data[numeric_cols].interpolate()
-        country_data = country_data.reset_index().rename(columns={'index': 'Year'})
-        filled_data1 = pd.concat([filled_data1, country_data], ignore_index=True)
-
-    filled_data1 = filled_data1.sort_values(by=['Country', 'Year']).reset_index(drop=True)
-
-    # Update population growth rate
-    filled_data1['Population Growth Rate (%)'] = filled_data1.groupby('Country')['Population'].pct_change() * 100
+    # Load dataset and fill the Country x Year grid (avg for sea level, max for population)
+    @st.cache_data
+    def load_filled_data():
+        df = data_catalog.load('climate_change')
+        filled_data = gap_fill.fill_country_years(df, agg='mean')
+        filled_data1 = gap_fill.fill_country_years(
+            df, agg='max', growth={'Population': 'Population Growth Rate (%)'})
+        return filled_data, filled_data1
+
+    filled_data, filled_data1 = load_filled_data()
 
     # Setup 
     countries_sea = sorted(filled_data['Country'].unique())
@@ -6,7 +6,9 @@ import plotly.graph_objects as go
 import seaborn as sns
 import matplotlib.pyplot as plt
 from pathlib import Path
-import scipy.stats as stats
+import data_catalog
+from disease_cube import CorrelationCube, DiseaseCube
+from fast_kde import kde_grid
 
 def run():
     # Streamlit page configuration
@@ -25,12 +27,6 @@ def run():
         </style>
     """, unsafe_allow_html=True)
 
-    # Calculate Pearson correlation
-    def calculate_correlation(x, y):
-        if len(x) != len(y) or len(x) == 0:
-            return 0
-        return np.corrcoef(x, y)[0, 1]
-
     # Load and clean data
     @st.cache_data
     def load_and_clean_data():
@@ -39,7 +35,7 @@ def run():
             if not file_path.exists():
                 st.error(f"Error: The file '{file_path}' was not found. Please ensure it exists in '/Users/kirandeep/Documents/myProject@IITK/'.")
                 return None
-            df = pd.read_csv(file_path)
+            df = data_catalog.load("climate_disease")
             df = df.rename(columns=lambda x: x.strip().replace('"', ''))
             df = df.apply(lambda x: x.str.strip().replace('"', '') if x.dtype == "object" else x)
             
@@ -78,25 +74,44 @@ def run():
             st.error(f"Error loading data: {str(e)}")
             return None
 
+    # Country x year x month sums for the surface and seasonal charts
+    @st.cache_resource
+    def load_disease_cube():
+        df = load_and_clean_data()
+        if df is None:
+            return None
+        return DiseaseCube.from_frame(df, ['malaria_cases', 'dengue_cases', 'avg_temp_c', 'precipitation_mm'])
+
+    correlation_variables = ['avg_temp_c', 'precipitation_mm', 'air_quality_index', 'uv_index', 'malaria_cases', 'dengue_cases']
+
+    # Per-(country, year) sums of x and x*x^T for the correlation heatmap
+    @st.cache_resource
+    def load_correlation_cube():
+        df = load_and_clean_data()
+        if df is None:
+            return None
+        return CorrelationCube.from_frame(df, correlation_variables)
+
+    # Binned FFT density of temperature vs. precipitation, scaled by the mean case count
+    @st.cache_data
+    def compute_isocontour(countries, year_range, disease):
+        df = load_and_clean_data()
+        iso_df = df[df['year'].between(year_range[0], year_range[1])]
+        if countries:
+            iso_df = iso_df[iso_df['country'].isin(countries)]
+        x = np.linspace(iso_df['avg_temp_c'].min(), iso_df['avg_temp_c'].max(), 100)
+        y = np.linspace(iso_df['precipitation_mm'].min(), iso_df['precipitation_mm'].max(), 100)
+        Z = kde_grid(iso_df['avg_temp_c'], iso_df['precipitation_mm'], x, y)
+        return x, y, Z * iso_df[f'{disease}_cases'].mean()
+
     # Aggregate seasonal data
-    def aggregate_seasonal_data(df):
-        monthly_data = df.groupby('month').agg({
-            'malaria_cases': 'mean',
-            'dengue_cases': 'mean',
-            'avg_temp_c': 'mean',
-            'precipitation_mm': 'mean'
-        }).reset_index()
-        return monthly_data
+    def aggregate_seasonal_data(cube, country, year_range):
+        return cube.seasonal([country], year_range, ['malaria_cases', 'dengue_cases', 'avg_temp_c', 'precipitation_mm'])
 
     # Compute correlation matrix
-    def compute_correlation_matrix(df):
-        variables = ['avg_temp_c', 'precipitation_mm', 'air_quality_index', 'uv_index', 'malaria_cases', 'dengue_cases']
+    def compute_correlation_matrix(corr_cube, countries, year_range):
         labels = ['Temperature', 'Precipitation', 'AQI', 'UV Index', 'Malaria', 'Dengue']
-        corr_matrix = pd.DataFrame(index=labels, columns=labels)
-        for i, v1 in enumerate(variables):
-            for j, v2 in enumerate(variables):
-                corr_matrix.iloc[i, j] = calculate_correlation(df[v1], df[v2])
-        return corr_matrix.astype(float)
+        return pd.DataFrame(corr_cube.matrix(countries, year_range), index=labels, columns=labels)
 
     # Country coordinates
     country_coordinates = {
@@ -121,6 +136,8 @@ def run():
     df = load_and_clean_data()
     if df is None:
         return
+    cube = load_disease_cube()
+    corr_cube = load_correlation_cube()
 
     # Get unique countries
     countries = sorted(df['country'].unique().tolist())
@@ -130,11 +147,10 @@ def run():
     with st.expander("Controls", expanded=True):
         surface_country = st.selectbox("Country", countries, key="surface_country")
         surface_year_range = st.slider("Year Range", 2000, 2023, (2000, 2023), key="surface_years")
-    surface_df = df[(df['year'].between(surface_year_range[0], surface_year_range[1])) & (df['country'] == surface_country)]
-    if surface_df.empty:
+    if cube.row_count([surface_country], surface_year_range) == 0:
         st.warning(f"No data for {surface_country} in selected year range.")
     else:
-        pivot_data = surface_df.pivot_table(index='year', columns='month', values=f'{disease}_cases', aggfunc='mean')
+        pivot_data = cube.surface(surface_country, surface_year_range, f'{disease}_cases')
         if pivot_data.empty:
             st.warning(f"No {disease} case data for {surface_country} in selected years.")
         else:
@@ -190,13 +206,10 @@ def run():
     with st.expander("Controls", expanded=True):
         corr_countries = st.multiselect("Countries (up to 4)", countries, max_selections=4, key="corr_countries")
         corr_year_range = st.slider("Year Range", 2000, 2023, (2000, 2023), key="corr_years")
-    corr_df = df[(df['year'].between(corr_year_range[0], corr_year_range[1]))]
-    if corr_countries:
-        corr_df = corr_df[corr_df['country'].isin(corr_countries)]
-    if corr_df.empty:
+    if cube.row_count(corr_countries, corr_year_range) == 0:
         st.warning("No data for selected countries and year range.")
     else:
-        corr_matrix = compute_correlation_matrix(corr_df)
+        corr_matrix = compute_correlation_matrix(corr_cube, corr_countries, corr_year_range)
         fig_corr, ax = plt.subplots(figsize=(8, 6))
         sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=ax)
         st.pyplot(fig_corr)
@@ -207,11 +220,10 @@ def run():
         polar_country = st.selectbox("Country", countries, key="polar_country")
         polar_year_range = st.slider("Year Range", 2000, 2023, (2000, 2023), key="polar_years")
         seasonal_plot_type = st.selectbox("Plot Type", ["Cases vs. Cases", "Climate vs. Climate"], key="seasonal_plot")
-    polar_df = df[(df['year'].between(polar_year_range[0], polar_year_range[1])) & (df['country'] == polar_country)]
-    if polar_df.empty:
+    if cube.row_count([polar_country], polar_year_range) == 0:
         st.warning(f"No data for {polar_country} in selected year range.")
     else:
-        seasonal_data = aggregate_seasonal_data(polar_df)
+        seasonal_data = aggregate_seasonal_data(cube, polar_country, polar_year_range)
         if seasonal_plot_type == "Cases vs. Cases":
             malaria_norm = (seasonal_data['malaria_cases'] - seasonal_data['malaria_cases'].min()) / (seasonal_data['malaria_cases'].max() - seasonal_data['malaria_cases'].min() + 1e-10)
             dengue_norm = (seasonal_data['dengue_cases'] - seasonal_data['dengue_cases'].min()) / (seasonal_data['dengue_cases'].max() - seasonal_data['dengue_cases'].min() + 1e-10)
@@ -265,18 +277,10 @@ def run():
     with st.expander("Controls", expanded=True):
         iso_countries = st.multiselect("Countries (up to 2)", countries, max_selections=2, key="iso_countries")
         iso_year_range = st.slider("Year Range", 2000, 2023, (2000, 2023), key="iso_years")
-    iso_df = df[(df['year'].between(iso_year_range[0], iso_year_range[1]))]
-    if iso_countries:
-        iso_df = iso_df[iso_df['country'].isin(iso_countries)]
-    if iso_df.empty:
+    if cube.row_count(iso_countries, iso_year_range) == 0:
         st.warning("No data for selected countries and year range.")
     else:
-        iso_data = iso_df[['avg_temp_c', 'precipitation_mm', f'{disease}_cases']]
-        x = np.linspace(iso_data['avg_temp_c'].min(), iso_data['avg_temp_c'].max(), 100)
-        y = np.linspace(iso_data['precipitation_mm'].min(), iso_data['precipitation_mm'].max(), 100)
-        X, Y = np.meshgrid(x, y)
-        Z = stats.gaussian_kde([iso_data['avg_temp_c'], iso_data['precipitation_mm']])([X.ravel(), Y.ravel()]).reshape(X.shape)
-        Z = Z * iso_data[f'{disease}_cases'].mean()
+        x, y, Z = compute_isocontour(tuple(iso_countries), iso_year_range, disease)
         fig_iso = go.Figure(data=go.Contour(
             x=x,
             y=y,
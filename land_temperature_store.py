@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_catalog
+from temperature_cube import TemperatureCube
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "GlobalLandTemperaturesByCountry.csv"
+STORE_DIR = data_catalog.CACHE_DIR.parent / "land_temperatures"
+CHUNK_ROWS = 100_000
+
+# Continents and duplicated entries are dropped; the "(Europe)" variants keep the plain name
+DROP = {'Denmark', 'Antarctica', 'France', 'Europe', 'Netherlands',
+        'United Kingdom', 'Africa', 'South America'}
+REPLACE = {
+    'Denmark (Europe)': 'Denmark',
+    'France (Europe)': 'France',
+    'Netherlands (Europe)': 'Netherlands',
+    'United Kingdom (Europe)': 'United Kingdom',
+}
+
+# One flat binary file per column, read back with np.memmap
+COLUMNS = {
+    "country": np.int16,
+    "year": np.int16,
+    "month": np.int8,
+    "temp": np.float32,
+}
+
+
+def parse_dates(dt):
+    """Split fixed-format YYYY-MM-DD strings into int16 years and int8 months without datetime parsing."""
+    raw = np.asarray(dt, dtype="S10")
+    digits = raw.view(np.uint8).reshape(len(raw), 10).astype(np.int16) - ord("0")
+    if len(raw) and (digits[:, [0, 1, 2, 3, 5, 6]].min() < 0 or digits[:, [0, 1, 2, 3, 5, 6]].max() > 9):
+        raise ValueError("dt column is not in YYYY-MM-DD format")
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = (digits[:, 5] * 10 + digits[:, 6]).astype(np.int8)
+    return year, month
+
+
+def ingest(csv_path, store_path, chunksize=CHUNK_ROWS):
+    """Stream csv_path in chunks into a column store at store_path.
+
+    Dropped countries are filtered out and renamed ones merged while each
+    chunk is read, so memory use is bounded by `chunksize` regardless of
+    the file size.
+    """
+    store_path = Path(store_path)
+    tmp = store_path.with_name(store_path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    country_index = {}
+    years = set()
+    rows = 0
+
+    def code(name):
+        if name in DROP:
+            return -1
+        name = REPLACE.get(name, name)
+        return country_index.setdefault(name, len(country_index))
+
+    files = {name: open(tmp / f"{name}.bin", "wb") for name in COLUMNS}
+    try:
+        reader = pd.read_csv(
+            csv_path, chunksize=chunksize,
+            usecols=["dt", "AverageTemperature", "Country"],
+            dtype={"dt": str, "AverageTemperature": "float32", "Country": "category"},
+        )
+        for chunk in reader:
+            # Map the chunk's (few) category labels, then every row through a lookup table.
+            # Labels are visited in order of first appearance so codes follow the file order.
+            cat_codes = chunk["Country"].cat.codes.to_numpy()
+            categories = chunk["Country"].cat.categories
+            lookup = np.full(len(categories) + 1, -1, dtype=np.int16)
+            for i in pd.unique(cat_codes[cat_codes >= 0]):
+                lookup[i] = code(categories[i])
+            countries = lookup[cat_codes]
+            keep = countries >= 0
+            year, month = parse_dates(chunk["dt"].to_numpy()[keep])
+            years.update(np.unique(year).tolist())
+
+            countries[keep].tofile(files["country"])
+            year.astype(np.int16).tofile(files["year"])
+            month.tofile(files["month"])
+            chunk["AverageTemperature"].to_numpy()[keep].tofile(files["temp"])
+            rows += int(keep.sum())
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {"rows": rows, "countries": list(country_index), "years": sorted(years)}
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    shutil.rmtree(store_path, ignore_errors=True)
+    os.replace(tmp, store_path)
+    logger.info("Ingested %d rows of %s into %s", rows, csv_path, store_path)
+    return store_path
+
+
+def open_store(csv_path=SOURCE):
+    """Return (meta, memory-mapped columns) for csv_path, ingesting it on first use per file version."""
+    store_path = STORE_DIR / data_catalog.file_hash(csv_path)
+    if not (store_path / "meta.json").exists():
+        ingest(csv_path, store_path)
+    meta = json.loads((store_path / "meta.json").read_text())
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        if meta["rows"]:
+            columns[name] = np.memmap(store_path / f"{name}.bin", dtype=dtype, mode="r", shape=(meta["rows"],))
+        else:
+            columns[name] = np.empty(0, dtype=dtype)
+    return meta, columns
+
+
+def load_cube(csv_path=SOURCE, chunk_rows=CHUNK_ROWS):
+    """Build the TemperatureCube for csv_path from its column store, one slice at a time."""
+    meta, cols = open_store(csv_path)
+
+    def chunks():
+        for start in range(0, meta["rows"], chunk_rows):
+            end = start + chunk_rows
+            yield (cols["country"][start:end], cols["year"][start:end], cols["month"][start:end],
+                   cols["temp"][start:end])
+
+    return TemperatureCube.from_chunks(meta["countries"], meta["years"], chunks())
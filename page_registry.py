@@ -0,0 +1,78 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Map sidebar labels to the module that provides the page's run()
+PAGES = {
+    "Imran's Task": "imran_climate_trends",
+    "Suyamoon's Task": "suyamoon_bird_migration",
+    "Chaitanya's Task": "chaitanya",
+    "Anirban's Task": "anirban",
+    "Vijiyant and Garvit's Task": "garvit",
+    "Kirandeep's Task": "kirandeep",
+    "Kameshwor's Task": "kameshwor",
+}
+
+# Set WARM_PAGES=0 to keep a worker down to the pages it actually serves
+WARM_PAGES = os.environ.get("WARM_PAGES", "1") != "0"
+
+_modules = {}
+_import_times = {}
+_warm_thread = None
+_warm_lock = threading.Lock()
+
+
+def _import(module_name):
+    module = _modules.get(module_name)
+    if module is not None:
+        return module
+    # importlib holds a per-module lock, so a page imported by the warm-up
+    # thread and the script thread at the same time is only executed once
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    if module_name not in _import_times:
+        _import_times[module_name] = elapsed
+        logger.info("Imported page module %s in %.3fs", module_name, elapsed)
+    _modules[module_name] = module
+    return module
+
+
+def get_page(label):
+    """Return the run() function for a sidebar label, importing its module on first use."""
+    module_name = PAGES.get(label)
+    if module_name is None:
+        return None
+    return _import(module_name).run
+
+
+def warm_pages():
+    """Import the remaining page modules in a background thread (once per process)."""
+    global _warm_thread
+    if not WARM_PAGES:
+        return
+    with _warm_lock:
+        if _warm_thread is not None:
+            return
+        pending = [name for name in PAGES.values() if name not in _modules]
+        if not pending:
+            return
+
+        def _warm():
+            for name in pending:
+                try:
+                    _import(name)
+                except Exception:
+                    logger.exception("Background import of %s failed", name)
+            logger.info("Page warm-up finished in %.3fs total", sum(_import_times.values()))
+
+        _warm_thread = threading.Thread(target=_warm, name="page-warmup", daemon=True)
+        _warm_thread.start()
+
+
+def import_times():
+    return dict(_import_times)
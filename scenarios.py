@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+import forecast_service
+
+OPERATIONS = ("add", "scale")
+
+
+def normalize(spec):
+    """Hashable, canonical form of a scenario: a tuple of (variable, operation, amount, region or None).
+
+    "add" shifts the variable by amount (e.g. +1 for +1 °C); "scale"
+    multiplies it (0.8 for -20%). Perturbations apply in order.
+    """
+    out = []
+    for variable, operation, amount, region in spec:
+        if operation not in OPERATIONS:
+            raise ValueError(f"unknown operation {operation!r}, expected one of {OPERATIONS}")
+        out.append((str(variable), operation, float(amount), region or None))
+    return tuple(out)
+
+
+def perturb(values, features, row_regions, spec):
+    """Apply a scenario to stacked feature rows (rows, features) with broadcasting.
+
+    row_regions holds each row's region; a perturbation with a region only
+    touches that region's rows.
+    """
+    shift = np.zeros(values.shape, dtype=np.float32)
+    scale = np.ones(values.shape, dtype=np.float32)
+    for variable, operation, amount, region in normalize(spec):
+        column = np.zeros(len(features), dtype=bool)
+        column[features.index(variable)] = True
+        rows = np.ones(len(values), dtype=bool) if region is None else row_regions == region
+        hit = rows[:, None] & column[None, :]
+        if operation == "add":
+            shift += np.where(hit, amount, 0.0).astype(np.float32)
+        else:
+            # A later scale also scales earlier shifts, as applying them in turn would
+            scale *= np.where(hit, amount, 1.0).astype(np.float32)
+            shift *= np.where(hit, amount, 1.0).astype(np.float32)
+    return values * scale + shift
+
+
+def run(model, meta, frames, location_regions, spec, batch_size=4096):
+    """Baseline vs scenario predictions per location and target.
+
+    The baseline and perturbed series go through a single batched
+    prediction. Returns a frame with location, region, target, the mean
+    predicted monthly cases under both, and the absolute and relative change.
+    """
+    features, targets = meta["features"], meta["targets"]
+    values, offsets = forecast_service.stack_frames(frames, features)
+    locations = list(frames)
+    regions = np.array([location_regions.get(loc) for loc in locations], dtype=object)
+    row_regions = np.repeat(regions, np.diff(offsets))
+
+    perturbed = perturb(values, features, row_regions, spec)
+    both = np.concatenate([values, perturbed])
+    both_offsets = np.r_[offsets, offsets[1:] + offsets[-1]]
+    predicted = forecast_service.predict_series(model, meta, both, both_offsets, batch_size)
+    baseline, scenario = predicted[:len(values)], predicted[len(values):]
+
+    # Mean over each location's months, for every target at once
+    sizes = np.maximum(np.diff(offsets), 1)[:, None]
+    base_mean = np.add.reduceat(baseline, offsets[:-1], axis=0) / sizes
+    scen_mean = np.add.reduceat(scenario, offsets[:-1], axis=0) / sizes
+    out = pd.DataFrame({
+        "location": np.repeat(locations, len(targets)),
+        "region": np.repeat(regions, len(targets)),
+        "target": np.tile(targets, len(locations)),
+        "baseline": base_mean.ravel(),
+        "scenario": scen_mean.ravel(),
+    })
+    out["change"] = out["scenario"] - out["baseline"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["pct_change"] = out["change"] / out["baseline"].abs() * 100
+    return out
@@ -2,40 +2,109 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
+import bird_movement
+import data_catalog
+from group_stats import grouped_mode
+from trajectory_lod import TrajectoryLOD
 
 def run():
-    # Load and preprocess data
+    bird_colors = {'Eric': 'red', 'Nico': 'blue', 'Sanne': 'green'}
+    arrows = np.array(['↑','↗','→','↘','↓','↙','←','↖','N/A'])
+
+    def labels(keys, format):
+        # Format each distinct key once and keep the column as a categorical of the labels;
+        # keys whose label comes out missing stay missing
+        codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+        label_codes, categories = pd.factorize(np.asarray(format(uniques), dtype=object))
+        return pd.Categorical.from_codes(label_codes[codes], categories)
+
+    # Data plus every hover/plot column, built once per file version and shared
+    # by all reruns and sessions; treat it as read-only.
+    @st.cache_resource
+    def load_birds(data_hash):
+        # date_time is parsed to UTC by the catalog
+        raw = data_catalog.load("bird_migration")
+        date_time = raw['date_time']
+        day = date_time.dt.floor('D')
+        seconds = (date_time - day) // pd.Timedelta(seconds=1)
+        direction = raw['direction'].to_numpy(dtype=np.float64)
+        # 45° sectors centred on N, NE, ...; missing directions map to 'N/A'
+        sector = np.floor(((direction + 360) % 360 + 22.5) / 45) % 8
+        sector = np.where(np.isnan(sector), 8, sector).astype(np.intp)
+        return raw.assign(
+            color=raw['bird_name'].map(bird_colors),
+            Date=labels(day, lambda u: u.strftime('%Y-%m-%d')),
+            Time=labels(seconds, lambda u: pd.to_datetime(u, unit='s').strftime('%H:%M:%S')),
+            **{
+                'Altitude (m)': labels(raw['altitude'], lambda u: pd.Series(u).astype(str) + " m"),
+                'Speed (m/s)': labels(raw['speed_2d'].round(2), lambda u: pd.Series(u).astype(str) + " m/s"),
+                'Direction Arrow': pd.Categorical.from_codes(sector, arrows),
+                'Direction (deg)': labels(raw['direction'].round(1), lambda u: pd.Series(u).astype(str) + "°"),
+            },
+            date=day.dt.date,
+            hour=date_time.dt.hour,
+        )
+
+    # Per-bird arrays for the three trajectory maps: coordinates, colour values,
+    # stacked hover columns and the Douglas–Peucker levels for every zoom
+    @st.cache_resource
+    def load_tracks(data_hash):
+        birddata = load_birds(data_hash)
+        columns = ['bird_name', 'Date', 'Time', 'Altitude (m)', 'Speed (m/s)', 'Direction Arrow', 'Direction (deg)']
+        tracks = {}
+        for bird, data in birddata.groupby('bird_name', observed=True, sort=False):
+            lat, lon = data['latitude'].to_numpy(), data['longitude'].to_numpy()
+            tracks[bird] = dict(
+                lat=lat,
+                lon=lon,
+                speed=data['speed_2d'].to_numpy(),
+                altitude=data['altitude'].to_numpy(),
+                time=data['date_time'].dt.tz_convert(None).to_numpy(),
+                customdata=np.stack([data[c].to_numpy(dtype=object) for c in columns], axis=-1),
+                lod=TrajectoryLOD(lat, lon),
+            )
+        return tracks
+
+    # Per-(bird, day) mean speed/altitude, fix count and dominant country from one
+    # groupby, plus the hourly mean speeds
+    @st.cache_resource
+    def load_aggregates(data_hash):
+        birddata = load_birds(data_hash)
+        grouped = birddata.groupby(['bird_name', 'date'], observed=True)
+        daily = grouped.agg(
+            speed_2d=('speed_2d', 'mean'),
+            altitude=('altitude', 'mean'),
+            count=('bird_name', 'size'),
+        )
+        country = birddata['country'].cat
+        modes = grouped_mode(grouped.ngroup(), country.codes, len(daily))
+        daily['country'] = pd.Categorical.from_codes(modes, country.categories)
+        hourly_speed = (
+            birddata.groupby(['bird_name', 'hour'], observed=True)['speed_2d']
+            .mean()
+            .reset_index()
+        )
+        return daily.reset_index(), hourly_speed
+
+    # Haversine steps, ground speed and bearing for every fix, persisted to Parquet per file version
+    @st.cache_resource
+    def load_movement(data_hash):
+        return bird_movement.load_or_run("bird_migration")
+
     @st.cache_data
-    def load_data():
-        df = pd.read_csv("bird_migration_with_country.csv")
-        df['date_time'] = pd.to_datetime(df['date_time'], utc=True)
-        return df
+    def load_segments(data_hash, stop_speed, stop_hours):
+        return bird_movement.segments(load_movement(data_hash), stop_speed, stop_hours)
 
     st.set_page_config(layout="wide")
 
-    birddata = load_data()
+    data_hash = data_catalog.file_hash(data_catalog.DATASETS["bird_migration"]["path"])
+    birddata = load_birds(data_hash)
+    tracks = load_tracks(data_hash)
 
     bird_names = birddata['bird_name'].unique()
-    bird_colors = {'Eric': 'red', 'Nico': 'blue', 'Sanne': 'green'}
 
     st.title("Bird Migration")
 
-    birddata['color'] = birddata['bird_name'].map(bird_colors)
-    birddata['Date'] = birddata['date_time'].dt.strftime('%Y-%m-%d')
-    birddata['Time'] = birddata['date_time'].dt.strftime('%H:%M:%S')
-    birddata['Altitude (m)'] = birddata['altitude'].astype(str) + " m"
-    birddata['Speed (m/s)'] = birddata['speed_2d'].round(2).astype(str) + " m/s"
-
-    def direction_arrow(deg):
-        if pd.isna(deg):
-            return 'N/A'
-        arrows = ['↑','↗','→','↘','↓','↙','←','↖']
-        idx = int(((deg + 360) % 360 + 22.5) // 45) % 8
-        return arrows[idx]
-
-    birddata['Direction Arrow'] = birddata['direction'].apply(direction_arrow)
-    birddata['Direction (deg)'] = birddata['direction'].round(1).astype(str) + "°"
-
     hovertemplate = (
         "<span style='font-size:22px'><b>%{customdata[0]}</b></span><br><br>"
         "<span style='font-size:20px'>Date: <b>%{customdata[1]}</b></span><br><br>"
@@ -48,38 +117,15 @@ def run():
         "<extra></extra>"
     )
 
-    # Prepare data for plots
-    birddata['date'] = birddata['date_time'].dt.date
-    agg = (
-        birddata.groupby(['bird_name', 'date'])
-        .agg({
-            'speed_2d': 'mean',
-            'altitude': 'mean',
-            'country': lambda x: x.mode().iloc[0] if not x.mode().empty else x.iloc[0]
-        })
-        .reset_index()
-    )
-    birddata['hour'] = birddata['date_time'].dt.hour
-    hourly_speed = (
-        birddata.groupby(['bird_name', 'hour'])['speed_2d']
-        .mean()
-        .reset_index()
-    )
-    daily_counts = (
-    birddata.groupby(['bird_name', 'date'])
-    .agg(
-        count=('bird_name', 'size'),
-        country=('country', lambda x: x.mode().iloc[0] if not x.mode().empty else x.iloc[0])
-    )
-    .reset_index()
-)
+    daily, hourly_speed = load_aggregates(data_hash)
 
 
     # --- Tabs ---
-    tab1, tab2, tab3 = st.tabs([
+    tab1, tab2, tab3, tab4 = st.tabs([
         "Trajectory Map",
         "Daily Mean Speed",
-        "Hourly Mean Speed"
+        "Hourly Mean Speed",
+        "Stopovers"
     ])
     
 
@@ -105,6 +151,22 @@ def run():
         center_lat = eric_data['latitude'].mean()
         center_lon = eric_data['longitude'].mean()
 
+        # Points are simplified to about a pixel at the chosen zoom; fixes inside
+        # the date window are always sent at full resolution
+        first_day, last_day = birddata['date'].min(), birddata['date'].max()
+        col_zoom, col_window = st.columns([1, 2])
+        with col_zoom:
+            zoom = st.select_slider("Map zoom (detail level)", options=list(range(1, 13)), value=3)
+        with col_window:
+            window = st.slider("Full-resolution dates", min_value=first_day, max_value=last_day,
+                               value=(first_day, min(first_day + pd.Timedelta(days=7), last_day)))
+        window_start = np.datetime64(window[0])
+        window_end = np.datetime64(window[1]) + np.timedelta64(1, 'D')
+        shown = {
+            bird: track['lod'].indices(zoom, (track['time'] >= window_start) & (track['time'] < window_end))
+            for bird, track in tracks.items()
+        }
+
         # Set visibility for birds
         default_visible_map = {'Eric': True, 'Nico': 'legendonly', 'Sanne': 'legendonly'}
 
@@ -113,24 +175,16 @@ def run():
         fig = go.Figure()
 
         for bird in bird_names:
-            data = birddata[birddata['bird_name'] == bird]
+            track, idx = tracks[bird], shown[bird]
             fig.add_trace(go.Scattermapbox(
-                lat=data['latitude'],
-                lon=data['longitude'],
+                lat=track['lat'][idx],
+                lon=track['lon'][idx],
                 mode='markers+lines',
                 marker=dict(size=4, color=bird_colors[bird]),
                 line=dict(width=2, color=bird_colors[bird]),
                 name=bird,
                 visible=default_visible_map[bird],
-                customdata=np.stack([
-                    data['bird_name'],
-                    data['Date'],
-                    data['Time'],
-                    data['Altitude (m)'],
-                    data['Speed (m/s)'],
-                    data['Direction Arrow'],
-                    data['Direction (deg)']
-                ], axis=-1),
+                customdata=track['customdata'][idx],
                 hovertemplate=hovertemplate
             ))
 
@@ -138,7 +192,7 @@ def run():
             mapbox_style="carto-positron",
             mapbox=dict(
                 center=dict(lat=center_lat, lon=center_lon),
-                zoom=3
+                zoom=zoom
             ),
             margin={"r": 0, "t": 0, "l": 0, "b": 0},
             font=dict(size=20),
@@ -172,14 +226,14 @@ def run():
         fig_speed = go.Figure()
 
         for bird in bird_names:
-            data = birddata[birddata['bird_name'] == bird]
+            track, idx = tracks[bird], shown[bird]
             fig_speed.add_trace(go.Scattermapbox(
-                lat=data['latitude'],
-                lon=data['longitude'],
+                lat=track['lat'][idx],
+                lon=track['lon'][idx],
                 mode='markers',
                 marker=dict(
                     size=6,
-                    color=data['speed_2d'],
+                    color=track['speed'][idx],
                     colorscale='Turbo',
                     cmin=birddata['speed_2d'].min(),
                     cmax=birddata['speed_2d'].max(),
@@ -201,15 +255,7 @@ def run():
                 ),
                 name=bird,
                 visible=default_visible_map[bird],
-                customdata=np.stack([
-                    data['bird_name'],
-                    data['Date'],
-                    data['Time'],
-                    data['Altitude (m)'],
-                    data['Speed (m/s)'],
-                    data['Direction Arrow'],
-                    data['Direction (deg)']
-                ], axis=-1),
+                customdata=track['customdata'][idx],
                 hovertemplate=hovertemplate
             ))
 
@@ -217,7 +263,7 @@ def run():
             mapbox_style="carto-positron",
             mapbox=dict(
                 center=dict(lat=center_lat, lon=center_lon),
-                zoom=3
+                zoom=zoom
             ),
             margin={"r": 0, "t": 0, "l": 0, "b": 0},
             font=dict(size=20),
@@ -248,14 +294,14 @@ def run():
         fig_altitude = go.Figure()
 
         for bird in bird_names:
-            data = birddata[birddata['bird_name'] == bird]
+            track, idx = tracks[bird], shown[bird]
             fig_altitude.add_trace(go.Scattermapbox(
-                lat=data['latitude'],
-                lon=data['longitude'],
+                lat=track['lat'][idx],
+                lon=track['lon'][idx],
                 mode='markers',
                 marker=dict(
                     size=6,
-                    color=data['altitude'],
+                    color=track['altitude'][idx],
                     colorscale='Turbo',
                     cmin=birddata['altitude'].min(),
                     cmax=birddata['altitude'].max(),
@@ -277,15 +323,7 @@ def run():
                 ),
                 name=bird,
                 visible=default_visible_map[bird],
-                customdata=np.stack([
-                    data['bird_name'],
-                    data['Date'],
-                    data['Time'],
-                    data['Altitude (m)'],
-                    data['Speed (m/s)'],
-                    data['Direction Arrow'],
-                    data['Direction (deg)']
-                ], axis=-1),
+                customdata=track['customdata'][idx],
                 hovertemplate=hovertemplate
             ))
 
@@ -293,7 +331,7 @@ def run():
             mapbox_style="white-bg",
             mapbox=dict(
                 center=dict(lat=center_lat, lon=center_lon),
-                zoom=3,
+                zoom=zoom,
                 layers=[
                     {
                         "below": 'traces',
@@ -334,7 +372,7 @@ def run():
         default_visible = [True, 'legendonly', 'legendonly']
         fig = go.Figure()
         for idx, bird in enumerate(['Eric', 'Nico', 'Sanne']):
-            df = agg[agg['bird_name'] == bird]
+            df = daily[daily['bird_name'] == bird]
             fig.add_trace(go.Scatter(
                 x=df['date'],
                 y=df['speed_2d'],
@@ -373,7 +411,8 @@ def run():
         - To detect country: \n
         &nbsp;&nbsp;&nbsp;&nbsp;- Reverse geocoding was slow (~17 hrs for 62k rows).  
         &nbsp;&nbsp;&nbsp;&nbsp;- So, used **spatial join** with shapefiles of known countries from trajectory.  
-        &nbsp;&nbsp;&nbsp;&nbsp;- Points outside polygons were labeled as **Ocean**.
+        &nbsp;&nbsp;&nbsp;&nbsp;- Points outside polygons were labeled as **Ocean**.  
+        &nbsp;&nbsp;&nbsp;&nbsp;- Reproducible offline with `python country_labeler.py bird_tracking.csv countries.geojson` (STRtree index, seconds per million fixes).
         - **Sanne** shows more frequent speed fluctuations than Eric and Nico.
         """)
 
@@ -446,6 +485,75 @@ def run():
         - **Nico is the fastest** overall among the three birds throughout the day.
         """)
 
+    with tab4:
+        st.header("Stopovers")
+        col_speed, col_hours = st.columns(2)
+        with col_speed:
+            stop_speed = st.slider("Stationary below (m/s)", 0.1, 3.0, bird_movement.STOP_SPEED, 0.1)
+        with col_hours:
+            stop_hours = st.slider("Minimum stopover (hours)", 1, 72, bird_movement.STOP_HOURS)
+        segments = load_segments(data_hash, stop_speed, stop_hours)
+        stops = segments[segments['kind'] == 'stopover']
+
+        summary = segments.groupby(['bird_name', 'kind'], observed=True).agg(
+            segments=('kind', 'size'), days=('hours', 'sum'), distance_km=('distance_km', 'sum')
+        ).unstack('kind', fill_value=0)
+        summary.columns = [f"{kind} {stat.replace('_', ' ')}" for stat, kind in summary.columns]
+        summary = summary.assign(**{c: summary[c] / 24 for c in summary.columns if c.endswith('days')})
+        st.dataframe(summary.round(1), use_container_width=True)
+
+        default_visible_stops = {'Eric': True, 'Nico': 'legendonly', 'Sanne': 'legendonly'}
+        fig = go.Figure()
+        for bird in bird_names:
+            df = stops[stops['bird_name'] == bird]
+            fig.add_trace(go.Scattermapbox(
+                lat=df['latitude'],
+                lon=df['longitude'],
+                mode='markers',
+                marker=dict(size=np.clip(np.sqrt(df['hours']) * 2, 6, 40), color=bird_colors[bird], opacity=0.7),
+                name=bird,
+                visible=default_visible_stops.get(bird, True),
+                customdata=np.stack([
+                    df['country'].astype(object),
+                    df['start'].dt.strftime('%Y-%m-%d %H:%M'),
+                    (df['hours'] / 24).round(1),
+                    df['fixes']
+                ], axis=-1),
+                hovertemplate=(
+                    "<b>" + bird + "</b><br>"
+                    "Country: %{customdata[0]}<br>"
+                    "Arrived: %{customdata[1]} UTC<br>"
+                    "Stayed: %{customdata[2]} days<br>"
+                    "Fixes: %{customdata[3]}<extra></extra>"
+                )
+            ))
+        fig.update_layout(
+            mapbox_style="carto-positron",
+            mapbox=dict(
+                center=dict(lat=center_lat, lon=center_lon),
+                zoom=3
+            ),
+            margin={"r": 0, "t": 0, "l": 0, "b": 0},
+            font=dict(size=20),
+            legend=dict(
+                x=0.01, y=0.99, bgcolor='black', bordercolor='black', borderwidth=1,
+                font=dict(size=16), orientation='h', xanchor='left', yanchor='top'
+            )
+        )
+        st.plotly_chart(fig, use_container_width=True, height=700)
+        st.markdown("""
+        - Distance and ground speed between consecutive fixes come from the **haversine** formula on the GPS positions, not the logger's speed_2d.
+        - Fixes reached below the speed threshold are **stationary**; short local trips (under 3 h, within 5 km) do not interrupt it, and a stationary run lasting at least the minimum duration is a **stopover** (marker size = length of stay).
+        - Everything between stopovers counts as **flight**, including short rests.
+        """)
+
+        st.subheader("Stopover list")
+        st.dataframe(
+            stops.drop(columns='kind').assign(days=(stops['hours'] / 24).round(2)).drop(columns='hours')
+            .round({'distance_km': 1, 'latitude': 4, 'longitude': 4}),
+            use_container_width=True, hide_index=True
+        )
+
         
 
 
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class TemperatureCube:
+    """Dense country x year x month sums of land temperature readings.
+
+    Holds the sum and count of non-missing temperatures, so any per-country
+    or per-year mean is a slice and a division instead of a scan of the raw table.
+    """
+
+    def __init__(self, countries, years, temp_sum, count):
+        self.countries = np.asarray(countries, dtype=object)
+        self.years = np.asarray(years)
+        self.temp_sum = temp_sum
+        self.count = count
+        self.country_index = {c: i for i, c in enumerate(self.countries)}
+        self.year_index = {int(y): i for i, y in enumerate(self.years)}
+
+    @classmethod
+    def from_chunks(cls, countries, years, chunks):
+        """Accumulate the cube from an iterable of (country code, year, month 1-12, temp) arrays.
+
+        `years` is the sorted year axis; only one chunk is held in memory at a time.
+        """
+        year_axis = np.asarray(years, dtype=np.int64)
+        shape = (len(countries), len(year_axis), 12)
+        size = int(np.prod(shape))
+        temp_sum = np.zeros(size)
+        count = np.zeros(size, dtype=np.int64)
+
+        for country_codes, chunk_years, months, temps in chunks:
+            temps = np.asarray(temps, dtype=np.float64)
+            valid = ~np.isnan(temps)
+            year_codes = np.searchsorted(year_axis, np.asarray(chunk_years, dtype=np.int64)[valid])
+            flat = np.ravel_multi_index((np.asarray(country_codes, dtype=np.int64)[valid], year_codes,
+                                         np.asarray(months, dtype=np.int64)[valid] - 1), shape)
+            temp_sum += np.bincount(flat, weights=temps[valid], minlength=size)
+            count += np.bincount(flat, minlength=size)
+
+        return cls(countries, year_axis, temp_sum.reshape(shape), count.astype(np.int32).reshape(shape))
+
+    @staticmethod
+    def _mean(total, count):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    def country_means(self):
+        """Mean temperature of every country over all readings, shape (countries,)."""
+        return self._mean(self.temp_sum.sum(axis=(1, 2)), self.count.sum(axis=(1, 2)))
+
+    def year_means(self, year):
+        """Mean temperature of every country in one year, shape (countries,)."""
+        i = self.year_index.get(int(year))
+        if i is None:
+            return np.full(len(self.countries), np.nan)
+        return self._mean(self.temp_sum[:, i].sum(axis=1), self.count[:, i].sum(axis=1))
+
+    def _yearly(self, totals, countries):
+        if countries is None:
+            return self._mean(totals.sum(axis=2), self.count.sum(axis=2))
+        # Countries missing from the data come back as all-NaN rows
+        rows = np.array([self.country_index.get(c, -1) for c in countries], dtype=np.int64)
+        out = self._mean(totals[rows].sum(axis=2), self.count[rows].sum(axis=2))
+        out[rows < 0] = np.nan
+        return out
+
+    def yearly_means(self, countries=None):
+        """Yearly mean temperature per country, shape (countries, years)."""
+        return self._yearly(self.temp_sum, countries)
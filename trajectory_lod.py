@@ -0,0 +1,183 @@
+import argparse
+import time
+
+import numpy as np
+
+TILE_SIZE = 256
+ZOOMS = range(0, 15)
+
+
+def mercator(lat, lon):
+    """Web-Mercator x, y in degree units, so one screen pixel spans the same distance everywhere."""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.05, 85.05)
+    y = np.degrees(np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)))
+    return np.asarray(lon, dtype=np.float64), y
+
+
+def tolerance(zoom, pixels=1.0):
+    """Mercator degrees covered by `pixels` screen pixels at a map zoom level."""
+    return 360.0 / (TILE_SIZE * 2.0 ** zoom) * pixels
+
+
+def dp_importance(x, y, offsets=None, floor=0.0):
+    """Douglas–Peucker importance of every point of one or more polylines.
+
+    A point is kept by Douglas–Peucker at tolerance eps exactly when its
+    importance is > eps (the smallest split distance on its path through
+    the recursion), so one pass yields every simplification level.
+    Endpoints get inf. `offsets` are the start offsets of each track plus
+    the total length; all tracks and all open segments of one recursion
+    depth are processed together with array operations.
+
+    Segments whose farthest point is within `floor` are not split further
+    (their points keep importance 0), which bounds the recursion on
+    stationary or straight stretches; levels with eps >= floor are exact.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    offsets = np.asarray([0, n] if offsets is None else offsets, dtype=np.int64)
+    importance = np.zeros(n)
+    ends = offsets[1:][offsets[1:] > offsets[:-1]] - 1
+    starts = offsets[:-1][offsets[1:] > offsets[:-1]]
+    importance[starts] = importance[ends] = np.inf
+    bound = np.full(len(starts), np.inf)
+
+    while len(starts):
+        open_ = ends - starts > 1
+        starts, ends, bound = starts[open_], ends[open_], bound[open_]
+        if not len(starts):
+            break
+        # Every interior point of every open segment, tagged with its segment
+        inner = ends - starts - 1
+        first = np.r_[0, np.cumsum(inner)[:-1]]
+        seg = np.repeat(np.arange(len(starts)), inner)
+        pts = starts[seg] + 1 + np.arange(len(seg)) - first[seg]
+
+        # Distance to the chord (to the start point when the chord has no length)
+        x0, y0 = x[starts][seg], y[starts][seg]
+        dx, dy = x[ends][seg] - x0, y[ends][seg] - y0
+        chord = np.hypot(dx, dy)
+        px, py = x[pts] - x0, y[pts] - y0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dist = np.where(chord > 0, np.abs(dx * py - dy * px) / chord, np.hypot(px, py))
+
+        # First farthest point per segment
+        dmax = np.maximum.reduceat(dist, first)
+        hits = np.flatnonzero(dist == dmax[seg])
+        _, at = np.unique(seg[hits], return_index=True)
+        split = pts[hits[at]]
+        level = np.minimum(dmax, bound)
+        importance[split] = level
+
+        deeper = dmax > floor
+        starts, ends, split, level = starts[deeper], ends[deeper], split[deeper], level[deeper]
+        starts, ends, bound = np.r_[starts, split], np.r_[split, ends], np.r_[level, level]
+    return importance
+
+
+def simplify(importance, eps):
+    """Indices of the points Douglas–Peucker keeps at tolerance eps."""
+    return np.flatnonzero(importance > eps)
+
+
+class TrajectoryLOD:
+    """Precomputed zoom-dependent simplification of one GPS track.
+
+    Holds the Douglas–Peucker importance of every fix in Mercator
+    coordinates and the kept indices for each zoom in ZOOMS, so picking a
+    level is a lookup and adding a full-resolution time window is one mask.
+    """
+
+    def __init__(self, lat, lon, pixels=1.0):
+        self.importance = dp_importance(*mercator(lat, lon), floor=tolerance(ZOOMS[-1], pixels))
+        self.pixels = pixels
+        self.levels = {zoom: simplify(self.importance, tolerance(zoom, pixels)) for zoom in ZOOMS}
+
+    def __len__(self):
+        return len(self.importance)
+
+    def indices(self, zoom, full=None):
+        """Points to draw at a zoom, plus every point where the boolean mask `full` is set."""
+        zoom = int(np.clip(round(zoom), ZOOMS[0], ZOOMS[-1]))
+        if full is None or not full.any():
+            return self.levels[zoom]
+        return np.flatnonzero((self.importance > tolerance(zoom, self.pixels)) | full)
+
+
+def _deviation(x, y, kept):
+    # Largest distance of any dropped point from the simplified polyline segment spanning it
+    seg = np.searchsorted(kept, np.arange(len(x)), side="right") - 1
+    seg = np.minimum(seg, len(kept) - 2)
+    a, b = kept[seg], kept[seg + 1]
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    px, py = x - x[a], y - y[a]
+    chord = np.hypot(dx, dy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dist = np.where(chord > 0, np.abs(dx * py - dy * px) / chord, np.hypot(px, py))
+    return dist.max()
+
+
+def _reference(x, y, eps):
+    # Textbook recursive Douglas–Peucker, for the check
+    keep = np.zeros(len(x), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(x) - 1)]
+    while stack:
+        s, e = stack.pop()
+        if e - s < 2:
+            continue
+        dx, dy = x[e] - x[s], y[e] - y[s]
+        px, py = x[s + 1:e] - x[s], y[s + 1:e] - y[s]
+        chord = np.hypot(dx, dy)
+        dist = np.abs(dx * py - dy * px) / chord if chord > 0 else np.hypot(px, py)
+        k = int(np.argmax(dist))
+        if dist[k] > eps:
+            keep[s + 1 + k] = True
+            stack += [(s, s + 1 + k), (s + 1 + k, e)]
+    return np.flatnonzero(keep)
+
+
+def _random_track(n, seed):
+    rng = np.random.default_rng(seed)
+    lat = 50 + np.cumsum(rng.normal(0, 0.01, n))
+    lon = 3 + np.cumsum(rng.normal(0, 0.01, n))
+    # Stopovers: stretches of repeated fixes at one spot
+    still = rng.random(n) < 0.3
+    keep = np.maximum.accumulate(np.where(still, 0, np.arange(n)))
+    return lat[keep], lon[keep]
+
+
+def _check(n):
+    lat, lon = _random_track(n, 0)
+    x, y = mercator(lat, lon)
+    importance = dp_importance(x, y)
+    for zoom in (3, 6, 9):
+        eps = tolerance(zoom)
+        kept = simplify(importance, eps)
+        same = np.array_equal(kept, _reference(x, y, eps))
+        print(f"n={n:>8} zoom={zoom:<2} kept {len(kept):>7} ({len(kept) / n:6.1%})  "
+              f"matches recursive DP: {same}  max deviation {_deviation(x, y, kept) / eps:.2f} px")
+
+
+def _bench(sizes):
+    for n in sizes:
+        lat, lon = _random_track(n, 1)
+        start = time.perf_counter()
+        lod = TrajectoryLOD(lat, lon)
+        print(f"n={n:>9}  {time.perf_counter() - start:.3f}s  points at zoom 3/6/9: "
+              f"{len(lod.levels[3])}/{len(lod.levels[6])}/{len(lod.levels[9])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the vectorized Douglas–Peucker against the recursive one and time it.")
+    parser.add_argument("--check", type=int, nargs="*", default=[2000, 20000])
+    parser.add_argument("--bench", type=int, nargs="*", default=[20_000, 200_000, 2_000_000])
+    args = parser.parse_args()
+    for n in args.check:
+        _check(n)
+    _bench(args.bench)
+
+
+if __name__ == "__main__":
+    main()